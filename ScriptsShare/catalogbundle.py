@@ -0,0 +1,302 @@
+'''
+catalogbundle.py
+Publishes the whole scripts share catalog into one bundle file at the share root.
+
+The catalog index still has to stat every tool folder, and small file I/O is the slowest thing the
+share does. The publish step compiles every scriptInformation_<program>.json (and optionally the
+icons, already scaled down to the toolbox's 32x32) into a single file that the toolbox reads in one
+go - optionally memory mapped.
+
+The bundle remembers each tool folder's signature (folder mtime + manifest mtime and size) from the
+publish. Opening the toolbox still stats every folder the way CatalogIndex.refresh does - folders that
+were added or changed since the publish are read from the share, the rest come out of the bundle.
+
+To publish (after publishing a batch of tools):
+mayapy MODULE_LOCATION_ON_YOUR_COMPUTER\ScriptsShare\catalogbundle.py SCRIPTS_SHARE_PATH --program maya --icons
+
+Bundle file layout -
+    header - magic, version, catalog length, icon data length, sha1 of everything after the header
+    catalog - utf-8 json {"program", "created", "entries": {folder name: {"signature", "manifest", "icon"(, "broken")}}}
+    icon data - raw premultiplied ARGB32 pixels of each icon back to back - an entry's "icon" is [source path, offset, width, height]
+'''
+
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+import argparse
+
+import catalogindex
+import missingpaths
+import tracing
+
+BUNDLE_MAGIC = 'SSCB'
+BUNDLE_VERSION = 1 # bump if the layout changes - older bundles are then ignored until republished
+BUNDLE_HEADER = struct.Struct('<4sIQQ20s')
+HASH_CHUNK = 1024 * 1024
+
+
+""" Default location of the bundle for a share/program """
+def default_bundle_path(scripts_path, program):
+    return os.path.join(scripts_path, 'scriptsShareBundle_' + program + '.ssb')
+
+
+""" A loaded bundle """
+class CatalogBundle(object):
+    def __init__(self, path, data, catalog, icons_offset, mapped=None):
+        """
+            data - the bundle's bytes - a string or an mmap
+            catalog - the parsed catalog json
+            icons_offset - where the icon data starts in data
+            mapped - (file, mmap) to close once the icons are no longer needed
+        """
+        self.path = path
+        self.data = data
+        self.catalog = catalog
+        self.entries = catalog.get('entries') or dict()
+        self.icons_offset = icons_offset
+        self.stale = set() # folders that changed since the publish - their manifests/icons came from the share (see refresh)
+        self._mapped = mapped
+
+    """ Reads and checks a bundle - None if it is missing, broken, out of date or for another program """
+    @classmethod
+    def load(cls, path, program, use_mmap=False):
+        """
+            use_mmap - map the file rather than reading it into a string - the icon data isn't copied into memory, but every page is still read once to check the hash
+        """
+        with tracing.span('CatalogBundle.load', path=path, mmap=use_mmap):
+            try:
+                f = open(path, 'rb')
+            except (IOError, OSError):
+                return None
+
+            mapped = None
+            try:
+                if use_mmap:
+                    import mmap
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    mapped = (f, data)
+                else:
+                    data = f.read() # one sequential read
+            except (IOError, OSError, ValueError):
+                f.close()
+                return None
+            if mapped is None:
+                f.close()
+
+            bundle = cls._parse(path, data, program, mapped)
+            if bundle is None and mapped is not None:
+                data.close()
+                f.close()
+            return bundle
+
+    @classmethod
+    def _parse(cls, path, data, program, mapped):
+        if len(data) < BUNDLE_HEADER.size:
+            return None
+        magic, version, catalog_length, icons_length, digest = BUNDLE_HEADER.unpack(data[:BUNDLE_HEADER.size])
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            return None
+        icons_offset = BUNDLE_HEADER.size + catalog_length
+        if len(data) != icons_offset + icons_length:
+            return None
+
+        # a half copied or hand edited bundle is ignored rather than trusted
+        sha = hashlib.sha1()
+        for start in range(BUNDLE_HEADER.size, len(data), HASH_CHUNK):
+            sha.update(data[start:min(start + HASH_CHUNK, len(data))])
+        if sha.digest() != digest:
+            print 'Sorry ' + path + ' is damaged - scanning the share instead'
+            return None
+
+        try:
+            catalog = json.loads(data[BUNDLE_HEADER.size:icons_offset].decode('utf-8'))
+        except ValueError:
+            return None
+        if catalog.get('program') != program:
+            return None
+        return cls(path, data, catalog, icons_offset, mapped)
+
+    """ Checks every tool folder against its published signature - folders added or changed since the publish are read from the share """
+    def refresh(self, scripts_path, workers=catalogindex.DISCOVERY_WORKERS):
+        """
+            scripts_path - full path to the directory where the script directories are
+            workers - how many folders to stat/read at once
+
+            Return: list of (folder name, signature, manifest dict) in directory listing order - folders gone from the share are dropped
+        """
+        program = self.catalog.get('program')
+        folders = list()
+        self.stale = set()
+        with tracing.span('CatalogBundle.refresh', path=scripts_path):
+            for dir, signature, manifest in catalogindex.load_script_folders(scripts_path, program, self.signatures(), workers):
+                if manifest is None:
+                    manifest = self.entries[dir].get('manifest') or dict()
+                    catalogindex.note_broken(dir, self.entries[dir])
+                else:
+                    self.stale.add(dir)
+                folders.append((dir, signature, manifest))
+        return folders
+
+    """ (folder name, manifest) for every tool folder in the bundle """
+    def manifests(self):
+        return [(dir, self.entries[dir].get('manifest') or dict()) for dir in sorted(self.entries)]
+
+    """ {folder name: signature} of every tool folder in the bundle """
+    def signatures(self):
+        return dict((dir, entry.get('signature')) for dir, entry in self.entries.items())
+
+    def has_icons(self):
+        return any(entry.get('icon') for entry in self.entries.values())
+
+    """ Scaled icon pixels published for a tool folder """
+    def icon(self, dir, source_path=None):
+        """
+            source_path - the icon the tool uses now - nothing comes back if the bundle has a different one
+
+            Return: (width, height, premultiplied ARGB32 bytes) - None if the bundle has no icon for it
+        """
+        entry = self.entries.get(dir)
+        icon = entry.get('icon') if entry and dir not in self.stale else None
+        if not icon or self.data is None:
+            return None
+        icon_path, offset, width, height = icon
+        if source_path is not None and icon_path != source_path:
+            return None
+        start = self.icons_offset + offset
+        return width, height, self.data[start:start + width * height * 4]
+
+    """ Lets go of the bundle's data - unmaps the file so the next publish can replace it """
+    def close(self):
+        if self._mapped is not None:
+            f, data = self._mapped
+            data.close()
+            f.close()
+            self._mapped = None
+        self.data = None
+
+
+""" Compiles the share's manifests (and optionally icons) into a bundle """
+def publish(scripts_path, program, bundle_path=None, icons=False, workers=catalogindex.DISCOVERY_WORKERS, use_index=True, share_scan=None):
+    """
+        scripts_path - full path to the directory where the script directories are
+        icons - also store every icon scaled down to the toolbox's size - needs Qt
+        use_index - read the manifests through the catalog index so unchanged folders aren't re-read (and keep it up to date)
+        share_scan - catalogindex.ShareScan() the manifests were already read into - publishing several programs then only walks the share once
+
+        Return: the path written - None if the bundle couldn't be written
+    """
+    bundle_path = bundle_path or default_bundle_path(scripts_path, program)
+
+    folders = share_scan.folders(program) if share_scan is not None else None
+    if use_index:
+        index = catalogindex.CatalogIndex(scripts_path, program)
+        index.load()
+        index.refresh(workers=workers, folders=folders)
+        if index.changed:
+            index.save()
+        entries = dict((dir, catalogindex.indexed_folder(dir, entry.get('signature'), entry.get('manifest') or dict(), entry.get('broken'))) for dir, entry in index.entries.items())
+    else:
+        if folders is None:
+            folders = catalogindex.load_script_folders(scripts_path, program, workers=workers)
+        missing = missingpaths.get_missing_paths()
+        entries = dict((dir, catalogindex.indexed_folder(dir, signature, manifest or dict(), missing.broken(dir, 'manifest'))) for dir, signature, manifest in folders)
+
+    icon_data = list()
+    if icons:
+        icon_data = _add_icons(entries)
+
+    catalog = {'program': program, 'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'entries': entries}
+    catalog_bytes = json.dumps(catalog, sort_keys=True).encode('utf-8')
+    icon_bytes = ''.join(icon_data)
+    digest = hashlib.sha1(catalog_bytes + icon_bytes).digest()
+
+    temp_path = '%s.%d.tmp' % (bundle_path, os.getpid())
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(catalog_bytes), len(icon_bytes), digest))
+            f.write(catalog_bytes)
+            f.write(icon_bytes)
+        # os.rename won't replace an existing file on windows
+        if os.path.exists(bundle_path):
+            os.remove(bundle_path)
+        os.rename(temp_path, bundle_path)
+    except (IOError, OSError):
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        return None
+    return bundle_path
+
+
+""" Scales every manifest's icon and files its pixels against the entry """
+def _add_icons(entries):
+    """
+        Return: list of pixel strings in the order their offsets were handed out
+    """
+    from qtshim import QtCore
+    import iconcache
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([]) # image plugins (jpg) need an application
+    thumbnails = iconcache.get_thumbnail_cache()
+
+    icon_data = list()
+    offset = 0
+    offsets = dict() # icon path: (offset, width, height) - shared icons are stored once
+    for dir in sorted(entries):
+        icon_path = entries[dir]['manifest'].get('icon')
+        if not icon_path:
+            continue
+        if icon_path not in offsets:
+            image = thumbnails.image(icon_path)
+            if image.isNull():
+                continue
+            pixels = iconcache.image_bytes(image)
+            offsets[icon_path] = (offset, image.width(), image.height())
+            icon_data.append(pixels)
+            offset += len(pixels)
+        icon_offset, width, height = offsets[icon_path]
+        entries[dir]['icon'] = [icon_path, icon_offset, width, height]
+    return icon_data
+
+
+""" Publish step """
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Publish the ScriptsShare catalog into a single bundle file.')
+    parser.add_argument('scripts_share_path', help='directory holding the tool folders')
+    parser.add_argument('--program', default='maya', help='program to bundle manifests for')
+    parser.add_argument('--all-programs', action='store_true', help='publish a bundle for every program with manifests on the share - the share is only walked once')
+    parser.add_argument('--bundle-path', default=None, help='where to write the bundle - defaults to the share root')
+    parser.add_argument('--icons', action='store_true', help='also bundle the scaled icons (needs Qt)')
+    parser.add_argument('--workers', type=int, default=catalogindex.DISCOVERY_WORKERS, help='folders to read at once')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.scripts_share_path):
+        print 'Sorry ' + args.scripts_share_path + ' is not a valid directory.'
+        return 1
+
+    if args.all_programs:
+        if args.bundle_path:
+            print 'Sorry, --bundle-path is one file - every program gets its own bundle with --all-programs.'
+            return 1
+        share_scan = catalogindex.ShareScan(args.scripts_share_path).scan(workers=args.workers)
+        programs = share_scan.programs()
+    else:
+        share_scan = None
+        programs = [args.program]
+
+    for program in programs:
+        bundle_path = publish(args.scripts_share_path, program, bundle_path=args.bundle_path, icons=args.icons, workers=args.workers, share_scan=share_scan)
+        if bundle_path is None:
+            print 'Sorry, could not write the %s bundle for %s' % (program, args.scripts_share_path)
+            return 1
+
+        print 'Published %s' % bundle_path
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
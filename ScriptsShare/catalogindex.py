@@ -0,0 +1,449 @@
+'''
+catalogindex.py
+Persistent on-disk index of the scriptInformation_<program>.json files on the scripts share.
+
+Opening the toolbox used to open every tool folder's json over the network. The index keeps the
+parsed manifests in a single file at the share root, keyed by a signature of each folder
+(folder mtime + manifest mtime and size), so only changed folders are re-read.
+
+To rebuild the index offline (publish machine / batch):
+mayapy MODULE_LOCATION_ON_YOUR_COMPUTER\ScriptsShare\catalogindex.py SCRIPTS_SHARE_PATH --program maya
+(--all-programs instead of --program indexes every scriptInformation_*.json variant from one walk of the share)
+
+ShareScan/get_share_scan read every program's manifests in that one walk - publishing/validation jobs
+that want each program's view (and scriptssharecore.build_infos) share a single cached scan.
+
+Folders without a manifest for the program are remembered in missingpaths against the folder's mtime,
+so they aren't looked for again until something is added to the folder. A broken manifest is kept in
+its index entry, so missingpaths' broken tools report still lists it on opens that don't re-read the folder.
+
+Index file format -
+{
+    "version": 1,
+    "program": "maya",
+    "entries": {
+        "flipObjectAlongXAxis": {"signature": [1500000000.0, 1500000000.0, 412], "manifest": {...}},
+        "brokenTool": {"signature": [...], "manifest": {}, "broken": ["broken json", "<share>/brokenTool/scriptInformation_maya.json"]}
+    }
+}
+'''
+
+import os
+import sys
+import json
+import stat
+import time
+import argparse
+import threading
+
+import tracing
+import missingpaths
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir # pip backport for python 2
+    except ImportError:
+        scandir = None
+
+INDEX_VERSION = 1
+DISCOVERY_WORKERS = 8 # stat/read calls in flight at once - the share is latency bound, not bandwidth bound
+MANIFEST_PREFIX = 'scriptInformation_'
+MANIFEST_SUFFIX = '.json'
+SHARE_SCAN_MAX_AGE = 30 # seconds a shared all-programs scan is handed out again before the share is walked again
+
+
+""" Name of the per program manifest inside a tool folder """
+def manifest_name(program):
+    return MANIFEST_PREFIX + program + MANIFEST_SUFFIX
+
+
+""" Program a manifest file name is for - None if it isn't a manifest """
+def manifest_program(name):
+    if name.startswith(MANIFEST_PREFIX) and name.endswith(MANIFEST_SUFFIX):
+        return name[len(MANIFEST_PREFIX):-len(MANIFEST_SUFFIX)] or None
+    return None
+
+
+""" Default location of the index for a share/program """
+def default_index_path(scripts_path, program):
+    return os.path.join(scripts_path, 'scriptsShareIndex_' + program + '.json')
+
+
+""" Reads a tool folder's manifest - empty dict if there isn't one """
+def read_manifest(path, program):
+    """
+    path - full directory path to the tool folder
+    program - program the manifest is for
+
+    Returns: dictionary with the json information
+    """
+    json_file = os.path.join(path, manifest_name(program))
+    content = dict()
+    with tracing.span('read_manifest', path=json_file):
+        if missingpaths.get_missing_paths().isfile(json_file):
+            with open(json_file) as f:
+                content = json.load(f)
+
+    return content
+
+
+""" Signature used to tell if a tool folder needs re-reading """
+def folder_signature(path, program, dir_stat=None):
+    """
+    path - full directory path to the tool folder
+    dir_stat - os.stat of the folder if the caller already has it
+
+    Returns: [folder mtime, manifest mtime, manifest size] - manifest values are None when there is no manifest
+    """
+    if dir_stat is None:
+        dir_stat = os.stat(path)
+    manifest_path = os.path.join(path, manifest_name(program))
+    missing = missingpaths.get_missing_paths()
+    # adding the manifest changes the folder's mtime, so it is only looked for again once the folder changes
+    if missing.is_missing(manifest_path, dir_stat.st_mtime):
+        return [dir_stat.st_mtime, None, None]
+    try:
+        manifest_stat = os.stat(manifest_path)
+    except OSError:
+        missing.add(manifest_path, dir_stat.st_mtime)
+        return [dir_stat.st_mtime, None, None]
+
+    return [dir_stat.st_mtime, manifest_stat.st_mtime, manifest_stat.st_size]
+
+
+""" The index of all of the manifests on the share for one program """
+class CatalogIndex(object):
+    def __init__(self, scripts_path, program, index_path=None):
+        """
+            scripts_path - full path to the directory where the script directories are
+            program - program the manifests are read for
+            index_path - where the index file lives - defaults to the share root
+        """
+        self.scripts_path = scripts_path
+        self.program = program
+        self.index_path = index_path or default_index_path(scripts_path, program)
+        self.entries = dict()
+        self.changed = False
+
+    """ Loads the index file - a missing, broken or out of date file just gives an empty index """
+    def load(self):
+        self.entries = dict()
+        self.changed = False
+        try:
+            with tracing.span('CatalogIndex.load', path=self.index_path):
+                with open(self.index_path) as f:
+                    content = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+
+        if content.get('version') != INDEX_VERSION or content.get('program') != self.program:
+            return False
+
+        self.entries = content.get('entries') or dict()
+        return True
+
+    """ Writes the index file - goes to a temp file first so readers never see a half written index """
+    def save(self):
+        """
+            Return: True if the index was written - False if the location isn't writable
+        """
+        content = {'version': INDEX_VERSION, 'program': self.program, 'entries': self.entries}
+        temp_path = '%s.%d.tmp' % (self.index_path, os.getpid())
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(content, f, sort_keys=True)
+            # os.rename won't replace an existing file on windows
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            os.rename(temp_path, self.index_path)
+        except (IOError, OSError):
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return False
+
+        self.changed = False
+        return True
+
+    """ Brings the index up to date with the share - only folders whose signature changed are re-read """
+    def refresh(self, full=False, workers=DISCOVERY_WORKERS, folders=None):
+        """
+            full - ignore the existing entries and re-read every folder
+            workers - how many folders to stat/read at once - 1 reads them one at a time
+            folders - load_script_folders style results already read (ie ShareScan.folders) - the share isn't touched
+
+            Return: list of (folder name, manifest dict) in directory listing order
+        """
+        if full:
+            self.entries = dict()
+            self.changed = True
+
+        known = dict((dir, entry.get('signature')) for dir, entry in self.entries.items())
+        manifests = list()
+        seen = set()
+        if folders is None:
+            folders = load_script_folders(self.scripts_path, self.program, known, workers)
+        missing = missingpaths.get_missing_paths()
+        for dir, signature, manifest in folders:
+            if manifest is None or known.get(dir) == signature:
+                manifest = self.entries[dir].get('manifest') or dict()
+                note_broken(dir, self.entries[dir]) # the folder isn't re-read, so the report would otherwise lose it
+            else:
+                self.entries[dir] = indexed_folder(dir, signature, manifest, missing.broken(dir, 'manifest'))
+                self.changed = True
+            manifests.append((dir, manifest))
+            seen.add(dir)
+
+        for dir in list(self.entries.keys()):
+            if dir not in seen:
+                del self.entries[dir]
+                self.changed = True
+
+        return manifests
+
+
+""" Index entry for a folder that was just read """
+def indexed_folder(dir, signature, manifest, broken=None):
+    """
+    broken - (problem, path) if the manifest couldn't be read - kept so later opens still report it
+
+    Returns: {"signature", "manifest"(, "broken")}
+    """
+    entry = {'signature': signature, 'manifest': manifest}
+    if broken:
+        entry['broken'] = list(broken)
+    return entry
+
+
+""" Repeats the broken manifest an index entry remembers into missingpaths' report """
+def note_broken(dir, entry):
+    broken = entry.get('broken')
+    if broken:
+        problem, path = broken
+        missingpaths.get_missing_paths().set_broken(dir, 'manifest', path, problem)
+
+
+""" Lists the tool folders on the share - scandir entries already know if they are directories """
+def list_script_folders(scripts_path):
+    """
+    Returns: list of (folder name, folder path, scandir entry or None) in directory listing order
+    """
+    folders = list()
+    if scandir is not None:
+        for entry in scandir(scripts_path):
+            if entry.name[:2] != '__' and entry.is_dir():
+                folders.append((entry.name, entry.path, entry))
+    else:
+        for dir in os.listdir(scripts_path):
+            if dir[:2] != '__':
+                folders.append((dir, os.path.join(scripts_path, dir), None))
+
+    return folders
+
+
+""" Stats and (if needed) reads one tool folder - runs on the discovery thread pool """
+def load_script_folder(folder, program, known_signature=None):
+    """
+    folder - (folder name, folder path, scandir entry or None) from list_script_folders
+    known_signature - signature of the copy already held - the manifest isn't re-read if it still matches
+
+    Returns: (folder name, signature, manifest dict or None when known_signature still matches) - None if it isn't a folder
+    """
+    dir, folder_path, entry = folder
+    try:
+        dir_stat = entry.stat() if entry is not None else os.stat(folder_path)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(dir_stat.st_mode):
+        return None
+
+    signature = folder_signature(folder_path, program, dir_stat=dir_stat)
+    if known_signature is not None and known_signature == signature:
+        return (dir, signature, None)
+
+    try:
+        manifest = read_manifest(folder_path, program)
+    except ValueError:
+        print 'Sorry ' + folder_path + ' has a broken ' + manifest_name(program)
+        missingpaths.get_missing_paths().set_broken(dir, 'manifest', os.path.join(folder_path, manifest_name(program)), 'broken json')
+        manifest = dict()
+    else:
+        missingpaths.get_missing_paths().clear_broken(dir, 'manifest')
+
+    return (dir, signature, manifest)
+
+
+""" Stats/reads every tool folder on the share through a bounded thread pool """
+def load_script_folders(scripts_path, program, known=None, workers=DISCOVERY_WORKERS):
+    """
+    scripts_path - full path to the directory where the script directories are
+    known - {folder name: signature} of manifests already held - those aren't re-read
+    workers - size of the thread pool - 1 (or less) loads the folders one at a time
+
+    Returns: list of load_script_folder results in directory listing order
+    """
+    known = known or dict()
+    folders = list_script_folders(scripts_path)
+    load = lambda folder: load_script_folder(folder, program, known.get(folder[0]))
+
+    if workers > 1 and len(folders) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(workers, len(folders)))
+        try:
+            results = pool.map(load, folders) # map keeps the listing order
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [load(folder) for folder in folders]
+
+    return [result for result in results if result is not None]
+
+
+""" Stats one tool folder and reads every program's manifest in it - runs on the discovery thread pool """
+def load_script_folder_programs(folder):
+    """
+    folder - (folder name, folder path, scandir entry or None) from list_script_folders
+
+    Returns: (folder name, folder mtime, {program: (signature, manifest dict)}) - None if it isn't a folder
+    """
+    dir, folder_path, entry = folder
+    try:
+        dir_stat = entry.stat() if entry is not None else os.stat(folder_path)
+        if not stat.S_ISDIR(dir_stat.st_mode):
+            return None
+        names = os.listdir(folder_path) # one listing finds every program's manifest
+    except OSError:
+        return None
+
+    manifests = dict()
+    for name in names:
+        program = manifest_program(name)
+        if program is None:
+            continue
+        try:
+            manifest_stat = os.stat(os.path.join(folder_path, name))
+        except OSError:
+            continue
+        try:
+            manifest = read_manifest(folder_path, program)
+        except ValueError:
+            print 'Sorry ' + folder_path + ' has a broken ' + name
+            missingpaths.get_missing_paths().set_broken(dir, 'manifest', os.path.join(folder_path, name), 'broken json')
+            manifest = dict()
+        except (IOError, OSError):
+            continue
+        manifests[program] = ([dir_stat.st_mtime, manifest_stat.st_mtime, manifest_stat.st_size], manifest)
+
+    return (dir, dir_stat.st_mtime, manifests)
+
+
+""" Every program's manifests on the share from one walk of it """
+class ShareScan(object):
+    def __init__(self, scripts_path):
+        """
+            scripts_path - full path to the directory where the script directories are
+        """
+        self.scripts_path = scripts_path
+        self.folders_read = list() # load_script_folder_programs results in directory listing order
+        self.scanned_at = None
+
+    """ Walks the share once - every folder is listed/read a single time whatever programs it has manifests for """
+    def scan(self, workers=DISCOVERY_WORKERS):
+        with tracing.span('ShareScan.scan', path=self.scripts_path):
+            folders = list_script_folders(self.scripts_path)
+            if workers > 1 and len(folders) > 1:
+                from multiprocessing.pool import ThreadPool
+                pool = ThreadPool(min(workers, len(folders)))
+                try:
+                    results = pool.map(load_script_folder_programs, folders) # map keeps the listing order
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                results = [load_script_folder_programs(folder) for folder in folders]
+        self.folders_read = [result for result in results if result is not None]
+        self.scanned_at = time.time()
+        return self
+
+    """ Every program with a manifest somewhere on the share """
+    def programs(self):
+        found = set()
+        for dir, dir_mtime, manifests in self.folders_read:
+            found.update(manifests)
+        return sorted(found)
+
+    """ One program's view of the share - the same (folder name, signature, manifest) list load_script_folders gives """
+    def folders(self, program):
+        results = list()
+        for dir, dir_mtime, manifests in self.folders_read:
+            signature, manifest = manifests.get(program, ([dir_mtime, None, None], dict()))
+            results.append((dir, signature, manifest))
+        return results
+
+
+_share_scans = dict() # scripts path: ShareScan()
+_share_scans_lock = threading.Lock()
+
+""" The shared all-programs scan of a share - walked again once it is older than max_age """
+def get_share_scan(scripts_path, max_age=SHARE_SCAN_MAX_AGE, workers=DISCOVERY_WORKERS):
+    """
+    max_age - seconds an earlier scan is still good for - 0 always walks the share again
+
+    Returns: ShareScan()
+    """
+    key = os.path.normcase(os.path.abspath(scripts_path))
+    # held while scanning so callers asking for other programs at the same time wait for this walk rather than starting their own
+    with _share_scans_lock:
+        share_scan = _share_scans.get(key)
+        if share_scan is None or max_age <= 0 or time.time() - share_scan.scanned_at > max_age:
+            share_scan = ShareScan(scripts_path).scan(workers=workers)
+            _share_scans[key] = share_scan
+        return share_scan
+
+
+""" Offline rebuild of the index """
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the ScriptsShare catalog index.')
+    parser.add_argument('scripts_share_path', help='directory holding the tool folders')
+    parser.add_argument('--program', default='maya', help='program to index manifests for')
+    parser.add_argument('--all-programs', action='store_true', help='index every program with manifests on the share - the share is only walked once')
+    parser.add_argument('--index-path', default=None, help='where to write the index - defaults to the share root')
+    parser.add_argument('--full', action='store_true', help='re-read every folder instead of only changed ones')
+    parser.add_argument('--workers', type=int, default=DISCOVERY_WORKERS, help='folders to read at once')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.scripts_share_path):
+        print 'Sorry ' + args.scripts_share_path + ' is not a valid directory.'
+        return 1
+
+    if args.all_programs:
+        if args.index_path:
+            print 'Sorry, --index-path is one file - every program gets its own index with --all-programs.'
+            return 1
+        share_scan = ShareScan(args.scripts_share_path).scan(workers=args.workers)
+        programs = share_scan.programs()
+    else:
+        share_scan = None
+        programs = [args.program]
+
+    for program in programs:
+        index = CatalogIndex(args.scripts_share_path, program, index_path=args.index_path)
+        if not args.full:
+            index.load()
+        folders = share_scan.folders(program) if share_scan is not None else None
+        manifests = index.refresh(full=args.full, workers=args.workers, folders=folders)
+        if not index.save():
+            print 'Sorry, could not write the index to ' + index.index_path
+            return 1
+
+        print 'Indexed %d tool folders into %s' % (len(manifests), index.index_path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+'''
+catalogmodel.py
+The toolbox's in-memory catalog - every tool stored once, grouped by index.
+
+Tools sit in a single table (one record per tool folder) and each project/type group is an array of
+integer positions in that table, so a tool shared to several projects and types costs a few ints per
+group rather than a copy of its information. Project/type names are interned so the thousands of
+"Animation"s read out of the manifests are one string.
+
+Removed tools leave a hole in the table that the next added tool reuses, so positions held by the
+groups never shift. An edited tool keeps its position, which keeps its place in the groups it is still in.
+
+To Use:
+catalog = CatalogModel()
+catalog.add('flipObjectAlongXAxis', info) # info needs parent_projects/parent_types - ie a ScriptInfo()
+catalog.icons('General', 'Modeling') # [info, ...]
+'''
+
+from array import array
+
+GROUP_TYPECODE = 'i' # table positions in the groups
+
+
+""" Tools table + project/type groups of table positions """
+class CatalogModel(object):
+    def __init__(self):
+        self.tools = list() # position: tool record - None where a tool was removed
+        self.positions = dict() # key: position
+        self.groups = dict() # project: {type: array of positions}
+        self._free = list() # holes left in tools by removed tools
+        self._strings = dict()
+
+    """ Shared copy of a string - every project/type name is held once however many tools use it """
+    def intern(self, text):
+        return self._strings.setdefault(text, text)
+
+    """ Adds a tool - a tool already added under key is replaced in place """
+    def add(self, key, tool):
+        """
+            key - unique key for the tool (its script folder) - None for a tool that can't be looked up/replaced later
+            tool - record with parent_projects/parent_types lists (ie a ScriptInfo())
+
+            Return: set of (project, type) groups whose icons changed
+        """
+        tool.parent_projects = [self.intern(project) for project in tool.parent_projects or []]
+        tool.parent_types = [self.intern(type) for type in tool.parent_types or []]
+        new_groups = set((project, type) for project in tool.parent_projects for type in tool.parent_types)
+
+        position = self.positions.get(key) if key is not None else None
+        if position is None:
+            position = self._free.pop() if self._free else len(self.tools)
+            if position == len(self.tools):
+                self.tools.append(tool)
+            else:
+                self.tools[position] = tool
+            if key is not None:
+                self.positions[key] = position
+            old_groups = set()
+        else:
+            old_tool = self.tools[position]
+            self.tools[position] = tool
+            old_groups = set((project, type) for project in old_tool.parent_projects for type in old_tool.parent_types)
+            for project, type in old_groups - new_groups:
+                self._ungroup(project, type, position)
+
+        for project, type in new_groups - old_groups:
+            self.groups.setdefault(project, dict()).setdefault(type, array(GROUP_TYPECODE)).append(position)
+        return old_groups | new_groups
+
+    """ Removes a tool """
+    def remove(self, key):
+        """
+            Return: (removed tool or None, set of (project, type) groups whose icons changed)
+        """
+        position = self.positions.pop(key, None)
+        if position is None:
+            return None, set()
+        tool = self.tools[position]
+        self.tools[position] = None
+        self._free.append(position)
+
+        affected = set((project, type) for project in tool.parent_projects for type in tool.parent_types)
+        for project, type in affected:
+            self._ungroup(project, type, position)
+        return tool, affected
+
+    """ Takes a position out of a group - empty groups and projects are dropped """
+    def _ungroup(self, project, type, position):
+        types = self.groups.get(project)
+        if types is None or type not in types:
+            return
+        positions = types[type]
+        if position in positions:
+            positions.remove(position)
+        if not positions:
+            del types[type]
+        if not types:
+            del self.groups[project]
+
+    """ The tool added under key - None if there isn't one """
+    def get(self, key):
+        position = self.positions.get(key)
+        return self.tools[position] if position is not None else None
+
+    """ (key, tool) for every tool that has a key """
+    def items(self):
+        return [(key, self.tools[position]) for key, position in self.positions.items()]
+
+    """ Every tool - in the order they were added """
+    def all_tools(self):
+        return [tool for tool in self.tools if tool is not None]
+
+    """ The tools in one project/type group """
+    def icons(self, project, type):
+        tools = self.tools
+        return [tools[position] for position in self.groups.get(project, dict()).get(type, ())]
+
+    """ {type: [tool]} for one project - None if the project has no tools """
+    def collapse_groups(self, project):
+        types = self.groups.get(project)
+        if not types:
+            return None
+        tools = self.tools
+        return dict((type, [tools[position] for position in positions]) for type, positions in types.items())
+
+    """ {project: {type: [tool]}} for the whole catalog - what the UI builds its tabs from """
+    def build_info(self):
+        return dict((project, self.collapse_groups(project)) for project in self.groups)
+
+    def __len__(self):
+        return len(self.tools) - len(self._free)
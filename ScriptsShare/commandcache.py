@@ -0,0 +1,64 @@
+'''
+commandcache.py
+Compiles the toolbox's manifest commands once and keeps the code objects around.
+
+Commands used to be handed to exec as raw strings so they were parsed and compiled on every
+click. They now get compiled when the manifest is loaded and clicks just run the code object.
+
+The manifest's "command_type" picks how a command's reload() calls behave -
+    "reload" (or not set) - reload() runs as written, so the tool module is re-executed every click (handy while developing a tool)
+    "import_once" - reload() hands the module straight back, so the tool is imported on the first click and reused after that
+'''
+
+COMMAND_TYPE_RELOAD = 'reload'
+COMMAND_TYPE_IMPORT_ONCE = 'import_once'
+
+_compiled_commands = dict() # command string: code object
+
+
+""" Gets the code object for a command - compiled the first time it is asked for """
+def compile_command(command_text):
+    """
+    command_text - the python command string from the manifest
+
+    Returns: code object - raises SyntaxError if the command isn't valid python
+    """
+    code = _compiled_commands.get(command_text)
+    if code is None:
+        code = compile(command_text, '<ScriptsShare command>', 'exec')
+        _compiled_commands[command_text] = code
+    return code
+
+
+""" Compiles a command ahead of its first click - commands that aren't python (ie MEL) are left alone """
+def precompile_command(command_text):
+    if not command_text:
+        return False
+    try:
+        compile_command(command_text)
+    except (SyntaxError, TypeError, ValueError):
+        return False
+    return True
+
+
+""" Stands in for reload() on import_once commands """
+def _reuse_module(module):
+    return module
+
+
+""" Runs a command's cached code object """
+def run_command(command_text, command_type=None):
+    """
+    command_text - the python command string from the manifest
+    command_type - the manifest's command_type - see the module notes
+    """
+    code = compile_command(command_text)
+    namespace = {'__name__': '__main__'}
+    if command_type == COMMAND_TYPE_IMPORT_ONCE:
+        namespace['reload'] = _reuse_module
+    exec code in namespace
+
+
+""" Forgets the compiled commands """
+def clear():
+    _compiled_commands.clear()
@@ -0,0 +1,106 @@
+'''
+commanddispatch.py
+Runs the toolbox's click commands off the mouse handler so a heavy tool never stalls the click.
+
+Clicks used to exec the tool's command right inside the Qt mouse release handler - the icon's pressed
+state and the toolbox's repaint waited on the whole tool. Clicks now only queue the command; it runs
+the next time the application is idle (maya.utils.executeDeferred in Maya, a zero timeout Qt timer
+otherwise), after the click has been painted.
+
+Commands run one at a time in the order they were clicked. Clicking a tool that is already queued or
+running - or that was only just clicked (a double click) - is ignored rather than running it twice.
+
+To Use:
+dispatcher = get_command_dispatcher()
+dispatcher.commandStarted.connect(showBusy) # key
+dispatcher.commandFinished.connect(hideBusy) # key, success
+dispatcher.dispatch('flipObjectAlongXAxis', call) # call() runs the command and returns True if it worked
+'''
+
+import time
+from collections import deque
+
+from qtshim import QtCore, Signal
+import tracing
+
+DUPLICATE_INTERVAL = 0.5 # seconds after a click that the same tool is treated as a double click
+
+
+""" Queues click commands and runs them in order when the application is idle """
+class CommandDispatcher(QtCore.QObject):
+    commandQueued = Signal(str) # key
+    commandStarted = Signal(str) # key
+    commandFinished = Signal(str, bool) # key, success
+
+    def __init__(self, defer=None, duplicate_interval=DUPLICATE_INTERVAL, parent=None):
+        """
+            defer - runs a callable the next time the application is idle (ie maya.utils.executeDeferred) - defaults to a zero timeout Qt timer, which fires once the event queue is empty
+            duplicate_interval - seconds after a tool is dispatched that dispatching it again is ignored
+        """
+        super(CommandDispatcher, self).__init__(parent)
+        self.defer = defer or (lambda call: QtCore.QTimer.singleShot(0, call))
+        self.duplicate_interval = duplicate_interval
+        self.queue = deque() # (key, call, queued time)
+        self.running = None # key of the command running now
+        self._pending = False # a run is queued with defer
+        self._dispatched = dict() # key: time it was last accepted
+
+    """ Queues a command - False if it was ignored as a duplicate """
+    def dispatch(self, key, call):
+        """
+            key - what identifies the command (the tool's script folder or its command text) - the signals carry it
+            call - runs the command - returns False if it failed
+        """
+        now = time.time()
+        if self.isBusy(key) or now - self._dispatched.get(key, 0) < self.duplicate_interval:
+            return False
+        self._dispatched[key] = now
+        self.queue.append((key, call, now))
+        self.commandQueued.emit(key)
+        self._queueRun()
+        return True
+
+    """ True while a command is queued or running """
+    def isBusy(self, key=None):
+        """
+            key - just that command - None for any command
+        """
+        if key is None:
+            return self.running is not None or bool(self.queue)
+        return self.running == key or any(queued_key == key for queued_key, call, queued in self.queue)
+
+    """ Drops everything that hasn't started yet """
+    def clear(self):
+        self.queue.clear()
+
+    def _queueRun(self):
+        if self.queue and not self._pending:
+            self._pending = True
+            self.defer(self.runNext)
+
+    """ Runs the oldest queued command - the next one waits for the following idle so the UI can paint in between """
+    def runNext(self):
+        self._pending = False
+        if self.running is not None or not self.queue:
+            return # a command that spins its own event loop (ie a modal dialog) - the rest wait for it to finish
+        key, call, queued = self.queue.popleft()
+        self.running = key
+        self.commandStarted.emit(key)
+        success = False
+        try:
+            with tracing.span('dispatch command', key=key, waited_ms=round((time.time() - queued) * 1000.0, 1)):
+                success = call() is not False
+        finally:
+            self.running = None
+            self.commandFinished.emit(key, success)
+            self._queueRun()
+
+
+_command_dispatcher = None
+
+""" The shared dispatcher every icon queues its clicks on """
+def get_command_dispatcher():
+    global _command_dispatcher
+    if _command_dispatcher is None:
+        _command_dispatcher = CommandDispatcher()
+    return _command_dispatcher
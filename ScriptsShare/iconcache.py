@@ -0,0 +1,286 @@
+'''
+iconcache.py
+Process wide cache of the decoded script icons.
+
+The same tool can sit under several projects/types, so without this its icon was read off the
+share and decoded once per IconLabelWidget. Pixmaps are keyed by path + mtime (an edited icon
+gets picked up when the toolbox is reopened or the tool's folder changes) and evicted least recently used
+first once the memory budget is used up. Each icon's mtime is only looked up on the share once - usually
+by the background loader - so a cache hit on the UI thread does no file I/O.
+
+QPixmaps only live on the UI thread so only use the cache from there.
+
+Underneath that is a thumbnail cache on the workstation's disk - icons scaled down to the 32x32
+the toolbox shows, stored as raw premultiplied pixels keyed by a hash of the source path + mtime.
+It is shared between Maya sessions so an unchanged icon is never read off the share again. The
+thumbnail cache only deals in QImages so it is fine to use from the background loader thread.
+Icons that are missing or won't decode are remembered in missingpaths so they aren't looked for on the
+share again until its TTL runs out - their tools get the error icon straight away.
+
+Shelf buttons need an image file, so building a shelf writes each thumbnail out once as a PNG next to it.
+'''
+
+import os
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+
+from qtshim import QtGui, QtCore
+import tracing
+import missingpaths
+
+DEFAULT_BUDGET = 32 * 1024 * 1024 # bytes of decoded pixels
+THUMBNAIL_SIZE = 32
+THUMBNAIL_MAGIC = 'SST1' # bump if the file layout changes
+THUMBNAIL_HEADER = struct.Struct('<4sII') # magic, width, height
+
+
+""" Default per user folder for the thumbnail cache - SCRIPTSSHARE_THUMBNAIL_DIR overrides it """
+def default_thumbnail_dir():
+    thumbnail_dir = os.environ.get('SCRIPTSSHARE_THUMBNAIL_DIR')
+    if thumbnail_dir:
+        return thumbnail_dir
+    root = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(root, 'ScriptsShare', 'thumbnails')
+
+
+_mtimes = dict() # icon path: mtime - each icon is only stat'd on the share once a toolbox session (see forget_mtime)
+
+""" mtime of an icon - None when it is missing (or was missing a moment ago, see missingpaths) """
+def get_mtime(path):
+    if not path:
+        return None
+    if path in _mtimes:
+        return _mtimes[path]
+    missing = missingpaths.get_missing_paths()
+    if missing.is_missing(path):
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except (OSError, TypeError):
+        missing.add(path)
+        mtime = None
+    _mtimes[path] = mtime
+    return mtime
+
+
+""" Drops the mtimes get_mtime remembered so the icons are stat'd again - ie a tool folder changed or the toolbox reopened """
+def forget_mtime(path=None):
+    """
+        path - just that icon - None forgets every icon
+    """
+    if path is None:
+        _mtimes.clear()
+    else:
+        _mtimes.pop(path, None)
+
+
+""" Raw pixel bytes of a QImage - PySide hands back a buffer, PyQt4 a sip.voidptr """
+def image_bytes(image):
+    bits = image.constBits()
+    if hasattr(bits, 'asstring'):
+        return bits.asstring(image.byteCount())
+    return str(bits)
+
+
+""" QImage from raw premultiplied ARGB32 pixels (ie a thumbnail file or the catalog bundle) """
+def image_from_bytes(pixels, width, height):
+    # copy() so the image owns its pixels rather than pointing into the string
+    return QtGui.QImage(pixels, width, height, QtGui.QImage.Format_ARGB32_Premultiplied).copy()
+
+
+""" Pre-scaled icons on the local disk """
+class ThumbnailCache(object):
+    def __init__(self, thumbnail_dir=None, size=THUMBNAIL_SIZE):
+        """
+            thumbnail_dir - folder the thumbnails are written to - defaults to a per user folder
+            size - thumbnails are scaled to fit in size x size
+        """
+        self.thumbnail_dir = thumbnail_dir or default_thumbnail_dir()
+        self.size = size
+
+    """ Thumbnail file for an icon version """
+    def thumbnail_path(self, path, mtime):
+        key = hashlib.sha1(('%s|%r|%d' % (path, mtime, self.size)).encode('utf-8')).hexdigest()
+        return os.path.join(self.thumbnail_dir, key[:2], key + '.thumb')
+
+    """ Gets the scaled QImage for an icon - from the local disk if it is there, otherwise decoded from the source and stored """
+    def image(self, path, mtime=None):
+        """
+            path - full path to the source icon
+            mtime - mtime of the source if the caller already has it
+
+            Return: QImage - null if the icon couldn't be read
+        """
+        with tracing.span('icon load', path=path):
+            return self._image(path, mtime)
+
+    def _image(self, path, mtime):
+        if mtime is None:
+            mtime = get_mtime(path)
+        if mtime is None:
+            return QtGui.QImage()
+
+        thumbnail_path = self.thumbnail_path(path, mtime)
+        image = self.read(thumbnail_path)
+        if image is not None:
+            return image
+
+        image = QtGui.QImage(path)
+        if image.isNull():
+            missingpaths.get_missing_paths().add(path) # unreadable - no point reading it again every open
+            return image
+        image = image.scaled(self.size, self.size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+        image = image.convertToFormat(QtGui.QImage.Format_ARGB32_Premultiplied)
+        self.write(thumbnail_path, image)
+        return image
+
+    """ Reads a thumbnail file - None if it is missing or broken """
+    def read(self, thumbnail_path):
+        try:
+            with open(thumbnail_path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return None
+        if len(data) < THUMBNAIL_HEADER.size:
+            return None
+
+        magic, width, height = THUMBNAIL_HEADER.unpack(data[:THUMBNAIL_HEADER.size])
+        pixels = data[THUMBNAIL_HEADER.size:]
+        if magic != THUMBNAIL_MAGIC or len(pixels) != width * height * 4:
+            return None
+
+        return image_from_bytes(pixels, width, height)
+
+    """ Writes a thumbnail file - a failed write just means it gets decoded again next time """
+    def write(self, thumbnail_path, image):
+        temp_path = '%s.%d.%d.tmp' % (thumbnail_path, os.getpid(), threading.current_thread().ident)
+        try:
+            thumbnail_folder = os.path.dirname(thumbnail_path)
+            if not os.path.isdir(thumbnail_folder):
+                os.makedirs(thumbnail_folder)
+            with open(temp_path, 'wb') as f:
+                f.write(THUMBNAIL_HEADER.pack(THUMBNAIL_MAGIC, image.width(), image.height()))
+                f.write(image_bytes(image))
+            if os.path.exists(thumbnail_path):
+                os.remove(thumbnail_path)
+            os.rename(temp_path, thumbnail_path)
+        except (IOError, OSError):
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return False
+        return True
+
+    """ A PNG of an icon's thumbnail for a Maya shelf button - written next to the thumbnail the first time it is asked for """
+    def shelf_icon(self, path, image=None):
+        """
+            path - full path to the source icon
+            image - the icon's thumbnail if the caller already has it (ie the ScriptInfo's image)
+
+            Return: path to the PNG - None if the icon couldn't be read
+        """
+        mtime = get_mtime(path)
+        if mtime is None:
+            return None
+        png_path = os.path.splitext(self.thumbnail_path(path, mtime))[0] + '.png'
+        if os.path.exists(png_path):
+            return png_path
+
+        if image is None or image.isNull():
+            image = self.image(path, mtime)
+            if image.isNull():
+                return None
+        temp_path = '%s.%d.%d.tmp' % (png_path, os.getpid(), threading.current_thread().ident)
+        try:
+            png_folder = os.path.dirname(png_path)
+            if not os.path.isdir(png_folder):
+                os.makedirs(png_folder)
+            if not image.save(temp_path, 'PNG'):
+                raise IOError('could not write ' + temp_path)
+            if os.path.exists(png_path):
+                os.remove(png_path)
+            os.rename(temp_path, png_path)
+        except (IOError, OSError):
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return None
+        return png_path
+
+
+""" Least recently used cache of QPixmaps with a memory budget """
+class IconCache(object):
+    def __init__(self, budget=DEFAULT_BUDGET, thumbnails=None):
+        """
+            budget - how many bytes of decoded pixmaps to hold before evicting
+            thumbnails - ThumbnailCache to get the scaled icons from - defaults to the shared one
+        """
+        self.budget = budget
+        self.thumbnails = thumbnails or get_thumbnail_cache()
+        self.used = 0
+        self._pixmaps = OrderedDict() # (path, mtime): (pixmap, cost) - oldest first
+
+    """ Gets the pixmap for an icon path - decoded once and shared after that """
+    def pixmap(self, path, image=None):
+        """
+            path - full path to the icon
+            image - scaled QImage of the icon if it has already been loaded (ie by the background loader)
+
+            Return: QPixmap - null if the icon couldn't be read
+        """
+        mtime = get_mtime(path)
+        key = (path, mtime)
+        cached = self._pixmaps.pop(key, None)
+        if cached is not None:
+            self._pixmaps[key] = cached # back to the most recently used end
+            return cached[0]
+
+        if image is None:
+            image = self.thumbnails.image(path, mtime=mtime)
+        pixmap = QtGui.QPixmap.fromImage(image)
+        if not pixmap.isNull():
+            self.insert(key, pixmap)
+        return pixmap
+
+    """ Adds a pixmap and evicts the least recently used ones until it is back under budget """
+    def insert(self, key, pixmap):
+        cost = pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) / 8
+        if cost > self.budget:
+            return
+        self._pixmaps[key] = (pixmap, cost)
+        self.used += cost
+        while self.used > self.budget:
+            old_key, (old_pixmap, old_cost) = self._pixmaps.popitem(last=False)
+            self.used -= old_cost
+
+    """ Empties the cache """
+    def clear(self):
+        self._pixmaps.clear()
+        self.used = 0
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+
+_icon_cache = None
+_thumbnail_cache = None
+
+""" The shared thumbnail cache """
+def get_thumbnail_cache():
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
+
+""" The shared cache every IconLabelWidget uses """
+def get_icon_cache():
+    global _icon_cache
+    if _icon_cache is None:
+        _icon_cache = IconCache()
+    return _icon_cache
@@ -1,4 +1,7 @@
+import re
 import maya.OpenMayaUI as OpenMayaUI
+import maya.cmds as cmds
+import maya.mel as mel
 import pymel.core as pmc
 from qtshim import QtGui, wrapinstance
 
@@ -60,3 +63,50 @@ class CollapsableGroup(QtGui.QGroupBox):
             self.setMaximumHeight(16777215)
         else:
             self.setMaximumHeight(20)
+
+
+def get_shelf_top_level():
+    return pmc.MelGlobals()['gShelfTopLevel']
+
+
+def build_shelf(shelf_name, buttons, replace=True):
+    """Build a whole shelf in one go and save the shelves once.
+
+    shelf_name - turned into a valid Maya UI name
+    buttons - list of dicts with command, image, annotation and label
+        for each shelf button - commands are python
+    replace - clear the buttons off an existing shelf of that name
+        rather than adding to the end of it
+
+    Return the shelf's full UI path.
+    """
+    shelf_top = get_shelf_top_level()
+    shelf_name = re.sub(r'\W+', '_', shelf_name).strip('_') or 'ScriptsShare'
+    if cmds.shelfLayout(shelf_name, exists=True):
+        if replace:
+            children = cmds.shelfLayout(shelf_name, query=True, childArray=True) or []
+            if children:
+                cmds.deleteUI(children)
+    else:
+        cmds.shelfLayout(shelf_name, parent=shelf_top)
+    shelf_path = cmds.layout(shelf_name, query=True, fullPathName=True)
+
+    # Hold the shelf's repaints until every button is on it
+    shelf_widget = uipath_to_qtobject(shelf_path)
+    if shelf_widget is not None:
+        shelf_widget.setUpdatesEnabled(False)
+    try:
+        for button in buttons:
+            cmds.shelfButton(parent=shelf_path,
+                             command=button['command'],
+                             sourceType='python',
+                             image=button['image'],
+                             annotation=button.get('annotation') or '',
+                             label=button.get('label') or '')
+    finally:
+        if shelf_widget is not None:
+            shelf_widget.setUpdatesEnabled(True)
+
+    cmds.shelfTabLayout(shelf_top, edit=True, selectTab=shelf_name)
+    mel.eval('saveAllShelves "%s"' % shelf_top)
+    return shelf_path
@@ -0,0 +1,209 @@
+'''
+missingpaths.py
+Remembers paths on the share that weren't there so the toolbox stops asking for them on every open.
+
+On SMB a lookup for a file that doesn't exist is often the slowest lookup there is - and a manifest
+pointing at a deleted icon, or a tool folder without a manifest for this program, used to be asked
+for again every time the toolbox opened. Missing paths are remembered for MISSING_TTL seconds
+(kept on the workstation's disk between Maya sessions) and treated as missing without touching the
+share until then.
+
+A missing manifest can also be remembered against its folder's mtime - adding the manifest changes
+the folder's mtime, so a newly published manifest is still picked up straight away. Icons only have
+the TTL - an icon copied up to the path a manifest already points at shows up once it runs out.
+
+Tools found broken along the way (missing/unreadable icon, broken manifest) are kept for report().
+
+SCRIPTSSHARE_MISSING_PATHS overrides where the remembered paths are kept.
+
+To Use:
+missing = get_missing_paths()
+missing.isfile(path) # False straight away for a path remembered as missing
+missing.report() # [(tool, problem, path)]
+'''
+
+import os
+import json
+import time
+import atexit
+import threading
+
+MISSING_TTL = 600 # seconds a missing path is remembered before it is looked for again
+SAVE_VERSION = 1
+
+
+""" Default per user file the missing paths are kept in between sessions - SCRIPTSSHARE_MISSING_PATHS overrides it """
+def default_missing_path():
+    missing_path = os.environ.get('SCRIPTSSHARE_MISSING_PATHS')
+    if missing_path:
+        return missing_path
+    root = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(root, 'ScriptsShare', 'missing_paths.json')
+
+
+""" Negative lookup cache of paths + the broken tools found while loading """
+class MissingPaths(object):
+    def __init__(self, path=None, ttl=MISSING_TTL):
+        """
+            path - file the missing paths are saved to - None keeps them for this session only
+            ttl - seconds a missing path is remembered
+        """
+        self.path = path
+        self.ttl = ttl
+        self.changed = False
+        self._missing = dict() # path: (expires, validator or None)
+        self._broken = dict() # (tool, kind): (problem, path)
+        self._lock = threading.Lock() # the discovery thread pool and the loader thread both use it
+
+    """ True if path was missing less than ttl seconds ago """
+    def is_missing(self, path, validator=None):
+        """
+            validator - ie the parent folder's mtime now - a path remembered against a different one (or none) is looked for again
+        """
+        with self._lock:
+            entry = self._missing.get(path)
+            if entry is None:
+                return False
+            expires, known_validator = entry
+            if expires > time.time() and (validator is None or known_validator == validator):
+                return True
+            del self._missing[path]
+            self.changed = True
+            return False
+
+    """ Remembers path as missing """
+    def add(self, path, validator=None):
+        if not path:
+            return
+        with self._lock:
+            self._missing[path] = (time.time() + self.ttl, validator)
+            self.changed = True
+
+    """ Forgets path - it was found after all """
+    def discard(self, path):
+        with self._lock:
+            if self._missing.pop(path, None) is not None:
+                self.changed = True
+
+    """ os.path.isfile that answers False without a lookup for paths remembered as missing """
+    def isfile(self, path, validator=None):
+        if self.is_missing(path, validator):
+            return False
+        if os.path.isfile(path):
+            return True
+        self.add(path, validator)
+        return False
+
+    """ Notes a problem with a tool for the report - one per tool and kind """
+    def set_broken(self, tool, kind, path, problem):
+        """
+            tool - the tool's script folder
+            kind - 'manifest' or 'icon'
+            problem - what is wrong, for the report
+        """
+        with self._lock:
+            self._broken[(tool, kind)] = (problem, path)
+
+    """ (problem, path) noted with set_broken for a tool - None if it isn't broken """
+    def broken(self, tool, kind):
+        with self._lock:
+            return self._broken.get((tool, kind))
+
+    """ Clears a problem noted with set_broken - ie the tool's folder read fine this time """
+    def clear_broken(self, tool, kind):
+        with self._lock:
+            self._broken.pop((tool, kind), None)
+
+    """ The broken tools found so far """
+    def report(self):
+        """
+            Return: sorted list of (tool, problem, path)
+        """
+        with self._lock:
+            return sorted((tool, problem, path) for (tool, kind), (problem, path) in self._broken.items())
+
+    """ The report as text - one tool per line """
+    def format_report(self):
+        lines = ['%s: %s (%s)' % (tool, problem, path) for tool, problem, path in self.report()]
+        return '\n'.join(lines) or 'No broken tools found.'
+
+    """ Reads the paths remembered by earlier sessions - anything expired is dropped """
+    def load(self):
+        if not self.path:
+            return False
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get('version') != SAVE_VERSION:
+            return False
+        missing = data.get('missing')
+        if not isinstance(missing, dict):
+            return False
+        # a hand edited or half written file is skipped entry by entry - it must never stop the toolbox loading
+        now = time.time()
+        with self._lock:
+            for path, entry in missing.items():
+                if not isinstance(entry, list) or len(entry) != 2:
+                    continue
+                expires, validator = entry
+                if not isinstance(expires, (int, long, float)) or isinstance(expires, bool):
+                    continue
+                if validator is not None and not isinstance(validator, (int, long, float)):
+                    continue
+                if expires > now and path not in self._missing:
+                    self._missing[path] = (expires, validator)
+        return True
+
+    """ Writes the paths still remembered - goes to a temp file first like the thumbnails """
+    def save(self):
+        if not self.path:
+            return False
+        now = time.time()
+        with self._lock:
+            missing = dict((path, list(entry)) for path, entry in self._missing.items() if entry[0] > now)
+            self.changed = False
+        temp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        try:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(temp_path, 'w') as f:
+                json.dump({'version': SAVE_VERSION, 'missing': missing}, f)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError):
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._missing)
+
+
+_missing_paths = None
+_missing_paths_lock = threading.Lock()
+
+""" The shared negative lookup cache - loaded from the last session the first time it is asked for """
+def get_missing_paths():
+    global _missing_paths
+    if _missing_paths is None:
+        with _missing_paths_lock:
+            if _missing_paths is None:
+                missing = MissingPaths(default_missing_path())
+                missing.load()
+                _missing_paths = missing
+    return _missing_paths
+
+
+def _save_at_exit():
+    if _missing_paths is not None and _missing_paths.changed:
+        _missing_paths.save()
+
+atexit.register(_save_at_exit)
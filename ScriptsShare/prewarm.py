@@ -0,0 +1,135 @@
+'''
+prewarm.py
+Imports the modules the toolbox's commands use while Maya is sitting idle - opt in.
+
+The first click on a big tool imports its whole module tree right there in the click, which freezes
+Maya for seconds. The pre-warmer pulls the import statements out of every command and imports those
+modules a few at a time whenever Maya is idle - most used tools first - so the first click just runs
+the tool. Each idle slice stops importing once it has used its time budget, and any mouse/keyboard
+activity pauses it until the user has been quiet for a moment. cancel() stops it for good.
+
+Imports happen on the UI thread (tools import maya.cmds/Qt) - the budget keeps each slice short, but a
+single big module still takes as long as it takes.
+
+To Use:
+scheduler = PrewarmScheduler()
+scheduler.start(scripts_uibuildinfo, usage={'egControlPanel': 12}) # usage - clicks per tool folder
+'''
+
+import sys
+import importlib
+from timeit import default_timer
+
+from qtshim import QtGui, QtCore, Signal
+import searchindex
+import tracing
+
+PREWARM_SLICE_BUDGET = 0.05 # seconds of importing per idle slice
+PREWARM_START_DELAY = 5000 # ms after the toolbox has loaded before the first slice
+PREWARM_RESUME_DELAY = 3000 # ms of no user activity before a paused pre-warm picks up again
+ACTIVITY_EVENTS = (QtCore.QEvent.MouseButtonPress, QtCore.QEvent.MouseButtonDblClick, QtCore.QEvent.KeyPress, QtCore.QEvent.Wheel)
+
+
+""" The modules to import for a catalog - most used first """
+def module_queue(scripts_uibuildinfo, usage=None):
+    """
+        scripts_uibuildinfo - WindowUIBuildInfo() whose commands to pre-warm
+        usage - {tool folder: times used} - tools without usage fall back to how many commands share the module
+
+        Return: list of module names not imported yet
+    """
+    usage = usage or dict()
+    scores = dict() # module: (usage, commands using it)
+    for dir, info in scripts_uibuildinfo.catalog.items():
+        for module in searchindex.get_commandModules(info.command):
+            used, commands = scores.get(module, (0, 0))
+            scores[module] = (used + usage.get(dir, 0), commands + 1)
+    modules = [module for module in scores if module not in sys.modules]
+    return sorted(modules, key=lambda module: (-scores[module][0], -scores[module][1], module))
+
+
+""" Imports the toolbox's command modules in time boxed slices while the UI is idle """
+class PrewarmScheduler(QtCore.QObject):
+    moduleImported = Signal(str)
+    finished = Signal()
+
+    def __init__(self, defer=None, budget=PREWARM_SLICE_BUDGET, start_delay=PREWARM_START_DELAY, resume_delay=PREWARM_RESUME_DELAY, parent=None):
+        """
+            defer - runs a callable the next time the application is idle (ie maya.utils.executeDeferred) - defaults to a zero timeout Qt timer, which fires once the event queue is empty
+            budget - seconds of importing per idle slice
+            start_delay - ms to wait before the first slice
+            resume_delay - ms of quiet after user activity before carrying on
+        """
+        super(PrewarmScheduler, self).__init__(parent)
+        self.defer = defer or (lambda call: QtCore.QTimer.singleShot(0, call))
+        self.budget = budget
+        self.start_delay = start_delay
+        self.resume_delay = resume_delay
+        self.queue = list()
+        self.imported = list()
+        self.failed = dict() # module: error
+        self.running = False
+        self._pending = False # a slice is queued with defer
+        self._resume_timer = QtCore.QTimer(self)
+        self._resume_timer.setSingleShot(True)
+        self._resume_timer.timeout.connect(self._queueSlice)
+
+    """ Starts (or restarts with a new catalog) pre-warming """
+    def start(self, scripts_uibuildinfo, usage=None):
+        self.queue = module_queue(scripts_uibuildinfo, usage)
+        if not self.queue:
+            return
+        if not self.running:
+            self.running = True
+            app = QtGui.QApplication.instance()
+            if app is not None:
+                app.installEventFilter(self)
+        self._resume_timer.start(self.start_delay)
+
+    """ Stops pre-warming for good - anything already imported stays imported """
+    def cancel(self):
+        if self.running:
+            self.running = False
+            app = QtGui.QApplication.instance()
+            if app is not None:
+                app.removeEventFilter(self)
+        self._resume_timer.stop()
+        self.queue = list()
+
+    def _queueSlice(self):
+        if self.running and not self._pending:
+            self._pending = True
+            self.defer(self.runSlice)
+
+    """ Imports modules until the slice's budget is used up """
+    def runSlice(self):
+        self._pending = False
+        if not self.running or self._resume_timer.isActive():
+            return # cancelled, or paused by user activity - the resume timer queues the next slice
+
+        with tracing.span('prewarm slice'):
+            start = default_timer()
+            while self.queue and default_timer() - start < self.budget:
+                module = self.queue.pop(0)
+                if module in sys.modules:
+                    continue
+                try:
+                    with tracing.span('prewarm import', module=module):
+                        importlib.import_module(module)
+                except Exception as e: # a broken tool shouldn't stop the rest - its click reports the error as before
+                    self.failed[module] = e
+                    continue
+                self.imported.append(module)
+                self.moduleImported.emit(module)
+
+        if self.queue:
+            self._queueSlice()
+        else:
+            self.cancel()
+            self.finished.emit()
+
+    """ Pauses on user activity so imports never land in the middle of someone working """
+    def eventFilter(self, obj, event):
+        if event.type() in ACTIVITY_EVENTS:
+            self._resume_timer.start(self.resume_delay)
+        return False
@@ -0,0 +1,294 @@
+'''
+scriptssharecore.py
+The toolbox's catalog without the toolbox - reads the scripts share into ScriptInfo()s and the
+project/type build info, and writes tool manifests.
+
+Only needs the standard library so it imports in a blink and works from mayapy batch jobs,
+publishing scripts and the benchmarks without Qt or Maya loaded. The UI (scriptssharetoolbox_ui)
+builds its windows from what this hands back and re-exports ScriptInfo/WindowUIBuildInfo so older
+code importing them from there keeps working.
+
+To Use:
+import scriptssharecore
+build_info = scriptssharecore.WindowUIBuildInfo(full_path=SCRIPTS_SHARE_PATH, program='maya')
+build_info.ui_build_info # {project: {type: [ScriptInfo()]}}
+'''
+
+import os
+import json
+
+import catalogindex
+import catalogbundle
+import catalogmodel
+import missingpaths
+import tracing
+
+LEGACY_MANIFEST_NAME = 'scriptInformation.json' # what generate_scriptInfoJson has always written
+
+
+""" Gets the information from a tool folder's manifest - see catalogindex.read_manifest """
+def read_manifest(path, program):
+    return catalogindex.read_manifest(path, program)
+
+
+""" Writes a tool folder's manifest - goes to a temp file first so the toolbox never reads a half written one """
+def write_manifest(path, content, program=None):
+    """
+    path - full directory path to the tool folder
+    content - the manifest dictionary - {'command', 'icon', 'tooltip', 'parent_projects', 'parent_types'} and optionally 'command_type'
+    program - program the manifest is for - None writes the old scriptInformation.json
+
+    Returns: full path of the manifest written
+    """
+    json_file = os.path.join(path, catalogindex.manifest_name(program) if program else LEGACY_MANIFEST_NAME)
+    temp_file = '%s.%d.tmp' % (json_file, os.getpid())
+    with open(temp_file, 'w') as f:
+        json.dump(content, f, indent=4, sort_keys=True)
+    if os.path.exists(json_file):
+        os.remove(json_file)
+    os.rename(temp_file, json_file)
+    return json_file
+
+
+""" Class to bundle the information on the script - it is also the icon_info the UI builds the tool's icons from """
+class ScriptInfo(object):
+    __slots__ = ('command', 'icon', 'tooltip', 'parent_projects', 'parent_types', 'program', 'command_type', 'key', 'image')
+
+    """Init for ScriptInfo(): """
+    def __init__(self, json_path=None, program=None, scripts_info=None):
+        """
+            json_path: full path to the json that contains the run command information
+            scripts_info: already loaded json information (ie from the catalog index) - skips reading json_path
+        """
+        self.command = ''
+        self.icon = ''
+        self.tooltip = ''
+        self.parent_projects = list()
+        self.parent_types = list()
+        self.program = program
+        self.command_type = ''
+        self.key = None # the script folder - set once it is in a WindowUIBuildInfo()
+        self.image = None # scaled QImage of the icon when the background loader has decoded it
+        
+        with tracing.span('ScriptInfo', path=json_path):
+            if scripts_info is None:
+                dir_head, dir_tail = os.path.split(json_path)
+                if dir_tail[:2] != '__' and os.path.isdir(json_path):
+                    scripts_info = self.get_scriptInfoJson(json_path, program=self.program) # This hsould be turned into setters/getters but for now - this
+            
+            if scripts_info is not None:
+                self.command = scripts_info.get('command')
+                self.icon = scripts_info.get('icon')
+                self.tooltip = scripts_info.get('tooltip')
+                self.parent_projects = scripts_info.get('parent_projects')
+                self.parent_types = scripts_info.get('parent_types')
+                self.command_type = scripts_info.get('command_type')
+
+    """ Gets the information from the script info .json """
+    def get_scriptInfoJson(self, path, program):
+        """
+        path - full directory path to the json file with the script run information
+        
+        Returns: dictionary with the json information
+        """
+        return read_manifest(path, program)
+        
+    """ Generates the .json file that holds the script information """
+    def generate_scriptInfoJson(self, path, command, icon_path, tooltip, parent_projectlist, parent_typelist, command_type=None):
+        """
+            path - path to where the json run command script information document well be placed
+            program - valid programs for this tool
+            command - the text that will be placed on Maya's command shelf
+            icon_path - the path to the icon jpg
+            tooltip - a tooltip string when someone hovers over the icon
+            parent_projectlist - list of all projects you want this script to be placed under in the UI
+            parent_typelist - list of all types you want this script to be placed under in the UI
+            command_type - 'import_once' to import the tool once and reuse it rather than reloading it every click (see commandcache)
+        """
+        content = {'command': command, 'icon':icon_path, 'tooltip':tooltip, 'parent_projects':parent_projectlist, 'parent_types':parent_typelist}
+        if command_type:
+            content['command_type'] = command_type
+        return write_manifest(path, content)
+
+#class WindowUITabInfo():
+
+#class WindowUIGroupInfo():
+
+""" To bundle in the list of ScriptInfo()s and the Final UI Build Information for those Scripts """
+class WindowUIBuildInfo(object):
+    """Init for ScriptsUIBuild(): """
+    def __init__(self, full_path=None, program=None, use_index=True, index_path=None, workers=catalogindex.DISCOVERY_WORKERS, use_bundle=True, bundle_path=None, use_mmap=False, share_scan=None):
+        """
+            full_path: full path to the directory where the script directories are
+            use_index: read the manifests through the on-disk catalog index - only changed folders get re-read
+            index_path: where the catalog index lives - defaults to the share root
+            workers: how many script folders are stat'd/read at once during discovery - 1 walks the share one folder at a time
+            use_bundle: read the published catalog bundle when the share has one (see catalogbundle) - folders changed since the publish are still read from the share
+            bundle_path: where the bundle lives - defaults to the share root
+            use_mmap: memory map the bundle rather than reading it in one go
+            share_scan: catalogindex.ShareScan() holding every program's manifests - this program's are taken from it rather than the bundle/index/share (see build_infos)
+        """
+        
+        self.catalog = catalogmodel.CatalogModel() # every ScriptInfo() once + project/type groups of them
+        self.scripts_path = full_path
+        self.program = program
+        self.use_index = use_index
+        self.index_path = index_path
+        self.workers = workers
+        self.use_bundle = use_bundle
+        self.bundle_path = bundle_path
+        self.use_mmap = use_mmap
+        self.share_scan = share_scan
+        self.bundle = None # the catalogbundle.CatalogBundle() the manifests came from - held until its icons are taken (see release_bundle)
+        self.signatures = dict() # folder name: catalogindex signature - what the share looked like when it was read
+        self._search_index = None # built the first time something searches
+
+        if os.path.isdir(full_path):
+            self.generate_UIBuildInfo()
+
+    """ {project: {type: [ScriptInfo()]}} - built from the catalog when asked for so hold on to it rather than asking in a loop """
+    @property
+    def ui_build_info(self):
+        return self.catalog.build_info()
+
+    """ searchindex.SearchIndex() over the catalog - built on first use so batch jobs never pay for it """
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            import searchindex
+            with tracing.span('SearchIndex.from_buildInfo'):
+                self._search_index = searchindex.SearchIndex.from_buildInfo(self)
+        return self._search_index
+
+    """ Every ScriptInfo() in the catalog """
+    @property
+    def script_infos(self):
+        return self.catalog.all_tools()
+
+    """ Takes a path and sorts a list of ScriptInfo()s that you want to uses in the UI building process & creates a build info dict - needs refactor/cleanup """
+    def generate_UIBuildInfo(self):
+        """
+            Return: for funsies also simply returns the scripts list
+        """
+
+        # Get all of the script objects were adding
+        if os.path.isdir(self.scripts_path):
+            with tracing.span('generate_UIBuildInfo', path=self.scripts_path):
+                with tracing.span('get_scriptManifests'):
+                    manifests = self.get_scriptManifests()
+                for dir, scripts_info in manifests:
+                    final_script_path = os.path.join(self.scripts_path, dir)
+                    info = ScriptInfo(json_path=final_script_path, program=self.program, scripts_info=scripts_info)
+                    if info.parent_projects != None:
+                        self.add_scriptInfo(info, dir)
+
+        else:
+            print 'Sorry ' + self.scripts_path + ' is not a valid directory.'
+        
+        
+        return self.script_infos
+
+    """ Gets (folder name, json information) for every script folder on the share """
+    def get_scriptManifests(self):
+        if self.share_scan is not None:
+            folders = self.share_scan.folders(self.program)
+            self.signatures = dict((dir, signature) for dir, signature, manifest in folders)
+            return [(dir, manifest) for dir, signature, manifest in folders]
+
+        if self.use_bundle:
+            bundle_path = self.bundle_path or catalogbundle.default_bundle_path(self.scripts_path, self.program)
+            bundle = catalogbundle.CatalogBundle.load(bundle_path, self.program, use_mmap=self.use_mmap)
+            if bundle is not None:
+                folders = bundle.refresh(self.scripts_path, workers=self.workers) # folders changed since the publish are read from the share
+                self.signatures = dict((dir, signature) for dir, signature, manifest in folders)
+                if bundle.has_icons():
+                    self.bundle = bundle
+                else:
+                    bundle.close()
+                return [(dir, manifest) for dir, signature, manifest in folders]
+
+        if self.use_index:
+            index = catalogindex.CatalogIndex(self.scripts_path, self.program, index_path=self.index_path)
+            index.load()
+            manifests = index.refresh(workers=self.workers)
+            if index.changed:
+                index.save() # the share might be read only for artists - the offline rebuild covers that
+            self.signatures = dict((dir, entry.get('signature')) for dir, entry in index.entries.items())
+            return manifests
+
+        folders = catalogindex.load_script_folders(self.scripts_path, self.program, workers=self.workers)
+        self.signatures = dict((dir, signature) for dir, signature, manifest in folders)
+        return [(dir, manifest) for dir, signature, manifest in folders]
+
+    """ Lets go of the catalog bundle once its icons have been taken - a mapped bundle can't be republished while it is held """
+    def release_bundle(self):
+        if self.bundle is not None:
+            self.bundle.close()
+            self.bundle = None
+
+    """ Files a ScriptInfo() under each of its projects (tabs) and types (groups) """
+    def add_scriptInfo(self, info, dir=None):
+        """
+            dir - the script folder the info came from - lets update_scriptFolder find it again
+
+            Return: set of (project, type) groups whose icons changed
+        """
+        return self.catalog.add(dir, self.get_commandInfo(info, dir))
+
+    """ Readies a ScriptInfo() to be the icon_info the UI builds an icon from """
+    def get_commandInfo(self, info, dir=None):
+        info.key = dir
+        import commandcache
+        commandcache.precompile_command(info.command) # clicks then just run the code object
+        return info
+
+    """ The ScriptInfo() for a script folder - None if it isn't in the toolbox """
+    def get_scriptInfo(self, dir):
+        return self.catalog.get(dir)
+
+    """ Updates the build info in place for one added, edited or removed script folder """
+    def update_scriptFolder(self, dir, scripts_info=None, signature=None):
+        """
+            dir - the script folder name
+            scripts_info - the folder's new json information - None if the folder is gone
+            signature - the folder's new catalogindex signature
+
+            Return: set of (project, type) groups whose icons changed
+        """
+        self.signatures.pop(dir, None)
+        if self._search_index is not None:
+            self._search_index.remove(dir)
+
+        info = None
+        if scripts_info is not None:
+            self.signatures[dir] = signature
+            info = ScriptInfo(json_path=os.path.join(self.scripts_path, dir), program=self.program, scripts_info=scripts_info)
+
+        if info is None or info.parent_projects == None:
+            if scripts_info is None: # folder gone - so are its problems
+                missing = missingpaths.get_missing_paths()
+                missing.clear_broken(dir, 'manifest')
+                missing.clear_broken(dir, 'icon')
+            removed_info, affected = self.catalog.remove(dir)
+            return affected
+
+        # Edited scripts keep their place in groups they are still in
+        affected = self.add_scriptInfo(info, dir)
+        if self._search_index is not None:
+            self._search_index.add(dir, info, info)
+        return affected
+
+
+""" Every program's WindowUIBuildInfo() from a single walk of the share """
+def build_infos(full_path, programs=None, max_age=catalogindex.SHARE_SCAN_MAX_AGE, workers=catalogindex.DISCOVERY_WORKERS):
+    """
+        full_path: full path to the directory where the script directories are
+        programs: programs to build - None for every program with manifests on the share
+        max_age: seconds a shared scan of the share is reused for - callers asking within that get the same walk (see catalogindex.get_share_scan)
+
+        Return: {program: WindowUIBuildInfo()}
+    """
+    share_scan = catalogindex.get_share_scan(full_path, max_age=max_age, workers=workers)
+    if programs is None:
+        programs = share_scan.programs()
+    return dict((program, WindowUIBuildInfo(full_path=full_path, program=program, workers=workers, share_scan=share_scan)) for program in programs)
@@ -7,10 +7,32 @@ from ScriptsShare import scriptssharetoolbox
 reload(scriptssharetoolbox)
 toolbox = scriptssharetoolbox.ScriptsShareToolbox()
 toolbox.show()
+(reloading closes the previous toolbox window and removes its Maya callbacks - show() reuses the live window otherwise)
 
 For UI changes testing (Python anywhere but I've been using the Maya interpreter)
 mayapy MODULE_LOCATION_ON_YOUR_COMPUTER\ScriptsShare\scriptssharetoolbox_ui.py
 
+To rebuild the share's catalog index offline (ie after publishing a batch of tools)
+mayapy MODULE_LOCATION_ON_YOUR_COMPUTER\ScriptsShare\catalogindex.py SCRIPTS_SHARE_PATH --program maya
+
+To publish the whole catalog (and icons) into one bundle file the toolbox reads in a single go
+mayapy MODULE_LOCATION_ON_YOUR_COMPUTER\ScriptsShare\catalogbundle.py SCRIPTS_SHARE_PATH --program maya --icons
+
+To read the catalog without Qt or Maya (batch jobs, publishing scripts) use scriptssharecore - WindowUIBuildInfo/ScriptInfo live there
+
+Clicking an icon queues its command (see commanddispatch.py) - it runs from Maya's idle queue once the click has been painted.
+controller.commandStarted/commandFinished fire around each run so the UI can show it is busy.
+
+Right clicking a type group or a project's tab builds a whole Maya shelf from it in one go - or from script
+toolbox.build_project_shelf('General') / toolbox.build_project_shelf('General', 'Modeling')
+
+Paths found missing on the share (icons, manifests) aren't looked for again for a while - see missingpaths.py.
+Tools with a missing icon or broken manifest are listed in the toolbox's Broken Tools panel, or
+from ScriptsShare import missingpaths; print missingpaths.get_missing_paths().format_report()
+
+To see where the toolbox's time goes set SCRIPTSSHARE_TRACE to a trace .json path before starting Maya
+(or from ScriptsShare import tracing; tracing.enable(path) before show()) - see tracing.py
+
 scripts_info is a dictionary - jason files currently with the format of
 {
     "command": "import EnvironmentTools.skinExporter.skinExporter_UI as sui; reload(sui); suic = sui.asura_skinExporter_UI(); suic.showUI()", 
@@ -25,34 +47,223 @@ scripts_info is a dictionary - jason files currently with the format of
     ], 
     "tooltip": "Batch Exporter for static Asura Meshes"
 }
+optional "command_type": "import_once" imports the tool on its first click and reuses it after rather than reloading it every click
 """
 import os
 import sys
 import maya.OpenMaya as OpenMaya
-import pymel.core as pmc
+import maya.cmds as cmds
+import maya.utils
 import mayautils
 import scriptssharetoolbox_ui as scriptssharegui
+import commanddispatch
+import iconcache
+from qtshim import QtCore
 import json
 
+SELECTION_INTERVAL = 0 # ms - 0 means once per pass of the UI event loop
+LOADER_WAIT = 500 # ms teardown waits for a cancelled loader before leaving it to finish on its own
+_SESSION_ATTR = '_scriptsshare_toolbox_session'
+
+#############
+# Lifecycle #
+#############
+""" The record of the live toolbox window and Maya callback ids for this Maya session - kept on sys so it survives reload() """
+def get_session():
+    session = getattr(sys, _SESSION_ATTR, None)
+    if session is None:
+        session = {'window': None, 'callback_ids': list()}
+        setattr(sys, _SESSION_ATTR, session)
+    return session
+
+""" Tracks a Maya callback id so it gets removed when the window closes or the module reloads """
+def add_callback(callback_id):
+    get_session()['callback_ids'].append(callback_id)
+    return callback_id
+
+""" Removes a tracked Maya callback """
+def remove_callback(callback_id):
+    callback_ids = get_session()['callback_ids']
+    if callback_id in callback_ids:
+        callback_ids.remove(callback_id)
+    try:
+        OpenMaya.MMessage.removeCallback(callback_id)
+    except RuntimeError:
+        pass # already gone
+
+""" Whether a window's C++ side is still around """
+def is_window_alive(window):
+    if window is None:
+        return False
+    try:
+        window.objectName()
+    except RuntimeError:
+        return False
+    return True
+
+""" Removes every tracked callback and deletes the live window """
+def teardown_session():
+    session = get_session()
+    for callback_id in list(session['callback_ids']):
+        remove_callback(callback_id)
+
+    window = session['window']
+    session['window'] = None
+    controller = getattr(window, 'controller', None)
+    if controller is not None:
+        # otherwise the old controller keeps passing clicks on to the deleted window's status bar/cursor
+        controller.releaseDispatcher()
+    if is_window_alive(window):
+        loader = getattr(window, 'loader', None)
+        if loader is not None and loader.isRunning():
+            # a QThread can't be deleted while it is running - but a reload mid-load shouldn't hang Maya for the rest of the share scan
+            loader.cancel()
+            if not loader.wait(LOADER_WAIT):
+                scriptssharegui.detach_loader(loader)
+        watcher = getattr(window.centralWidget(), 'watcher', None)
+        if watcher is not None:
+            watcher.stop()
+        prewarmer = getattr(window.centralWidget(), 'prewarmer', None)
+        if prewarmer is not None:
+            prewarmer.cancel()
+        window.close()
+        window.deleteLater()
+    commanddispatch.get_command_dispatcher().clear() # clicks queued for the old window
+
+# reload(scriptssharetoolbox) runs this again - clear out the old module's callbacks and window so they don't pile up
+teardown_session()
+
+
+""" Bridges Maya's SelectionChanged event to ScriptsShareController.selectionChanged """
+class SelectionBridge():
+    """
+    Maya can fire SelectionChanged hundreds of times a second (marquee selection, scripted selection loops).
+    The callback only starts a single shot timer so all of those events coalesce into one emission, and the
+    selection is only looked up if something is actually connected to controller.selectionChanged.
+    The signal carries the long names of the selected transforms rather than PyNodes.
+    """
+    def __init__(self, controller, interval=SELECTION_INTERVAL):
+        """
+            controller - the ScriptsShareController to emit on
+            interval - ms to wait after the first event before emitting
+        """
+        self.controller = controller
+        self.callback_id = None
+        self._timer = QtCore.QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.emit_selection)
+
+    """ Starts listening to Maya """
+    def start(self):
+        if self.callback_id is None:
+            self.callback_id = add_callback(OpenMaya.MEventMessage.addEventCallback('SelectionChanged', self.on_selection_changed))
+
+    """ Stops listening to Maya and drops any pending emission """
+    def stop(self):
+        if self.callback_id is not None:
+            remove_callback(self.callback_id)
+            self.callback_id = None
+        self._timer.stop()
+
+    """ The Maya callback - kept as cheap as possible """
+    def on_selection_changed(self, *args):
+        if not self._timer.isActive() and self.controller.hasSelectionReceivers():
+            self._timer.start()
+
+    def emit_selection(self):
+        if self.controller.hasSelectionReceivers():
+            self.controller.selectionChanged.emit(cmds.ls(selection=True, type='transform', long=True) or [])
+
+""" Shelf button settings for tools - a tool listed more than once only gets one button """
+def get_shelfButtons(tools):
+    """
+        tools - the tools' ScriptInfo()s
+
+        Return: list of {command, image, annotation, label} for mayautils.build_shelf
+    """
+    thumbnails = iconcache.get_thumbnail_cache()
+    buttons = list()
+    seen = set()
+    for tool in tools:
+        key = getattr(tool, 'key', None) or id(tool)
+        if key in seen:
+            continue
+        seen.add(key)
+        icon, command, tooltip, image, command_type = scriptssharegui.get_iconDisplayInfo(tool)
+        if command == 'ERROR':
+            continue
+        # the 32x32 thumbnail the toolbox already has rather than the full size icon off the share
+        image_path = thumbnails.shelf_icon(icon, image=image) or icon
+        buttons.append({'command': command, 'image': image_path, 'annotation': tooltip, 'label': getattr(tool, 'key', None) or tooltip})
+    return buttons
+
+""" Builds (or rebuilds) a Maya shelf holding every tool given """
+def build_shelf(shelf_name, tools):
+    """
+        Return: the shelf's full UI path
+    """
+    return mayautils.build_shelf(shelf_name, get_shelfButtons(tools))
+
 """ Main Toolbox class ScriptsShareToolbox()"""
 class ScriptsShareToolbox():
-    def __init__(self):
+    def __init__(self, watch=False, prewarm=False):
+        """
+            watch - pick up tools published to the share while the toolbox is open
+            prewarm - import the tools' modules while Maya is idle so first clicks don't freeze (see prewarm.py)
+        """
         self._scripts_share_path = "%s/scripts/RebellionScripts/Misc/ScriptsShare/"%os.environ["MAYA_APP_DIR"]
         self._window = None
+        self._watch = watch
+        self._prewarm = prewarm
 
     """Main entry point into the script that shows the UI"""
     def show(self):
         if self._window is None:
-            controller = scriptssharegui.ScriptsShareController()
-            
-            def emit_selchanged(_): 
-                controller.selectionChanged.emit(pmc.selected(type='transform'))
-            OpenMaya.MEventMessage.addEventCallback('SelectionChanged', emit_selchanged)
-            parent = mayautils.get_maya_window()
-            self._window = scriptssharegui.create_window(controller, parent, self._scripts_share_path, program='maya')
-            def onconvert(prefix):
-                settings = dict(
-                    'b',
-                    prefix=unicode(prefix))
-            self._window.convertClicked.connect(onconvert)
-        self._window.show()   
\ No newline at end of file
+            session = get_session()
+            if is_window_alive(session['window']):
+                # Only one toolbox per session - a new ScriptsShareToolbox() picks up the live window
+                self._window = session['window']
+            else:
+                # clicked tools run from Maya's idle queue once the click has been painted rather than inside the mouse handler
+                commanddispatch.get_command_dispatcher().defer = maya.utils.executeDeferred
+                controller = scriptssharegui.ScriptsShareController()
+                
+                parent = mayautils.get_maya_window()
+                self._window = scriptssharegui.create_window_async(controller, parent, self._scripts_share_path, program='maya', watch=self._watch)
+                controller.shelfRequested.connect(build_shelf)
+                # The selection callback only lives while the window is open
+                self._window.selection_bridge = SelectionBridge(controller)
+                self._window.closed.connect(self._window.selection_bridge.stop)
+                def onconvert(prefix):
+                    settings = dict(
+                        'b',
+                        prefix=unicode(prefix))
+                self._window.convertClicked.connect(onconvert)
+                if self._prewarm:
+                    # executeDeferred runs each slice when Maya's own idle queue gets to it
+                    self._window.centralWidget().prewarmModules(defer=maya.utils.executeDeferred)
+                session['window'] = self._window
+        self._window.selection_bridge.start()
+        self._window.show()
+        self._window.raise_()
+
+    """ Builds a shelf from a whole project - or just one of its type groups """
+    def build_project_shelf(self, project, type=None, shelf_name=None):
+        """
+            shelf_name - defaults to the project (and type) name
+
+            Return: the shelf's full UI path - None if the toolbox hasn't loaded the project
+        """
+        scripts_uibuildinfo = self._window.centralWidget().scripts_uibuildinfo if self._window is not None else None
+        if scripts_uibuildinfo is None:
+            return None
+        catalog = scripts_uibuildinfo.catalog
+        if type is None:
+            collapse_groups = catalog.collapse_groups(project) or dict()
+            tools = [tool for group in sorted(collapse_groups) for tool in collapse_groups[group]]
+        else:
+            tools = catalog.icons(project, type)
+        if not tools:
+            return None
+        return build_shelf(shelf_name or (project if type is None else '%s %s' % (project, type)), tools)
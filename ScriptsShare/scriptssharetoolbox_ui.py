@@ -8,18 +8,82 @@ Notes: Accept extra modifiers to pass to commands -- ie flipObjectAlongAxis with
 from qtshim import QtGui, QtCore, Signal
 import sys
 import os
+import time
 import random
-import json
-import pymel.core as pm
+import traceback
+from collections import OrderedDict
+import catalogindex
+import iconcache
+import commandcache
+import commanddispatch
+import tracing
+import prewarm
+import usagelog
+import missingpaths
+from scriptssharecore import ScriptInfo, WindowUIBuildInfo # the catalog core - re-exported as they used to live here
+
+WATCH_DEBOUNCE = 2000 # ms of quiet on the share before a live refresh - a bulk publish only refreshes once
+RECENT_LIMIT = 8 # icons in each project's recent strip
+RECENT_HISTORY = 200 # most recently run tools read from the usage log for the recent strips
+SEARCH_LIMIT = 200 # most search results shown at once - short queries match most of a big share
+SEARCH_DEBOUNCE = 150 # ms of no typing before the search runs
+MODEL_PIXMAP_ROWS = 256 # pixmaps an IconListModel holds on to - a screenful or two, the shared IconCache budgets the rest
+WATCH_POLL_INTERVAL = 60000 # ms between rescans when file notifications don't come through (network drives) - 0 turns polling off
+WATCH_STOP_WAIT = 500 # ms stopping the watcher waits for a cancelled rescan before leaving it to finish on its own
 
 ###########
 # Signals #
 ###########
 class ScriptsShareController(QtCore.QObject):
-    selectionChanged = Signal(list)
+    selectionChanged = Signal(list) # long names of the selected transforms
+    commandStarted = Signal(str) # tool clicked (its script folder, or the command if it has none) - its command is running
+    commandFinished = Signal(str, bool) # tool, success
+    shelfRequested = Signal(str, object) # shelf name, [ScriptInfo()] - from the type group/project tab context menus
+
+    def __init__(self, parent=None):
+        super(ScriptsShareController, self).__init__(parent)
+        self._selection_receivers = 0
+        # clicks run through the shared dispatcher - pass its start/finish on so the window can show it is busy
+        dispatcher = commanddispatch.get_command_dispatcher()
+        dispatcher.commandStarted.connect(self.commandStarted)
+        dispatcher.commandFinished.connect(self.commandFinished)
+
+    # Counting connections lets the Maya side skip looking up the selection when nobody is listening
+    def connectNotify(self, signal):
+        if 'selectionChanged' in self._signalName(signal):
+            self._selection_receivers += 1
+        super(ScriptsShareController, self).connectNotify(signal)
+
+    def disconnectNotify(self, signal):
+        if 'selectionChanged' in self._signalName(signal):
+            self._selection_receivers = max(self._selection_receivers - 1, 0)
+        super(ScriptsShareController, self).disconnectNotify(signal)
+
+    """ Stops passing the shared dispatcher's signals on - the dispatcher outlives reloads so an old controller has to let go of it """
+    def releaseDispatcher(self):
+        dispatcher = commanddispatch.get_command_dispatcher()
+        try:
+            dispatcher.commandStarted.disconnect(self.commandStarted)
+            dispatcher.commandFinished.disconnect(self.commandFinished)
+        except (RuntimeError, TypeError):
+            pass # already released
+
+    def hasSelectionReceivers(self):
+        return self._selection_receivers > 0
+
+    def _signalName(self, signal):
+        # Qt4 hands over the signature string - newer bindings a QMetaMethod
+        if hasattr(signal, 'methodSignature'):
+            signal = signal.methodSignature()
+        return str(signal)
     
 class ConverterWindow(QtGui.QMainWindow):
     convertClicked = Signal(str)   
+    closed = Signal()
+
+    def closeEvent(self, event):
+        self.closed.emit()
+        super(ConverterWindow, self).closeEvent(event)
     
 ##############    
 # Widgets/UI #
@@ -33,6 +97,7 @@ class FlowLayout(QtGui.QLayout):
     
     def __init__(self, parent=None, margin=0, spacing=-1):
         super(FlowLayout, self).__init__(parent)
+        self.clearLayoutCache()
 
         if parent is not None:
             self.setMargin(margin)
@@ -51,6 +116,17 @@ class FlowLayout(QtGui.QLayout):
 
     def addItem(self, item):
         self.itemList.append(item)
+        self.clearLayoutCache()
+
+
+    def addWidgets(self, widgets):
+        """addWidgets - add several widgets - the caches are only cleared and the layout only invalidated once
+        """
+
+        for widget in widgets:
+            self.addChildWidget(widget)
+            self.itemList.append(QtGui.QWidgetItem(widget))
+        self.invalidate()
 
 
     def count(self):
@@ -65,6 +141,7 @@ class FlowLayout(QtGui.QLayout):
 
     def takeAt(self, index):
         if index >= 0 and index < len(self.itemList):
+            self.clearLayoutCache()
             return self.itemList.pop(index)
         return None
 
@@ -78,13 +155,20 @@ class FlowLayout(QtGui.QLayout):
 
 
     def heightForWidth(self, width):
-        height = self.doLayout(QtCore.QRect(0, 0, width, 0), True)
+        height = self._heightCache.get(width)
+        if height is None:
+            height = self.doLayout(QtCore.QRect(0, 0, width, 0), True)
+            self._heightCache[width] = height
         return height
 
 
     def setGeometry(self, rect):
         super(FlowLayout, self).setGeometry(rect)
-        self.doLayout(rect, False)
+        # Only the top left and width change where things go - skip the pass if those haven't moved
+        placement = (rect.x(), rect.y(), rect.width())
+        if placement != self._lastPlacement:
+            self.doLayout(rect, False)
+            self._lastPlacement = placement
 
 
     def sizeHint(self):
@@ -92,43 +176,71 @@ class FlowLayout(QtGui.QLayout):
 
 
     def minimumSize(self):
-        size = QtCore.QSize()
+        w = self.geometry().width()
+        h = self.heightForWidth(w)
+        return QtCore.QSize(w + 2 * self.margin(), h + 2 * self.margin())
 
-        for item in self.itemList:
-            size = size.expandedTo(item.minimumSize())
 
-        size += QtCore.QSize(2 * self.margin(), 2 * self.margin())
-        return size
+    def invalidate(self):
+        # Qt calls this when a child's size hint or style changes
+        self.clearLayoutCache()
+        super(FlowLayout, self).invalidate()
 
-    def minimumSize(self):
-        w = self.geometry().width()
-        h = self.doLayout(QtCore.QRect(0, 0, w, 0), True)
-        return QtCore.QSize(w + 2 * self.margin(), h + 2 * self.margin())
+
+    def clearLayoutCache(self):
+        """clearLayoutCache - forget the cached item sizes/spacing and layout results
+        """
+
+        self._itemGeometry = None
+        self._heightCache = dict()
+        self._lastPlacement = None
+
+
+    def itemGeometry(self):
+        """itemGeometry - (width, height, spaceX, spaceY) for each item - cached until the items change
+        """
+
+        if self._itemGeometry is None:
+            geometry = list()
+            styles = dict()
+            for item in self.itemList:
+                style = item.widget().style()
+                spacing = styles.get(style)
+                if spacing is None:
+                    spaceX = self.spacing() + style.layoutSpacing(QtGui.QSizePolicy.PushButton, QtGui.QSizePolicy.PushButton, QtCore.Qt.Horizontal)
+                    spaceY = self.spacing() + style.layoutSpacing(QtGui.QSizePolicy.PushButton, QtGui.QSizePolicy.PushButton, QtCore.Qt.Vertical)
+                    spacing = styles[style] = (spaceX, spaceY)
+                hint = item.sizeHint()
+                geometry.append((hint.width(), hint.height()) + spacing)
+            self._itemGeometry = geometry
+        return self._itemGeometry
     
 
     def doLayout(self, rect, testOnly=False):
         """
         """
+        with tracing.span('FlowLayout.doLayout', items=len(self.itemList), width=rect.width(), testOnly=testOnly):
+            return self._doLayout(rect, testOnly)
+
+    def _doLayout(self, rect, testOnly):
         x = rect.x()
         y = rect.y()
+        right = rect.right()
         lineHeight = 0
 
-        for item in self.itemList:
-            wid = item.widget()
-            spaceX = self.spacing() + wid.style().layoutSpacing(QtGui.QSizePolicy.PushButton, QtGui.QSizePolicy.PushButton, QtCore.Qt.Horizontal)
-            spaceY = self.spacing() + wid.style().layoutSpacing(QtGui.QSizePolicy.PushButton, QtGui.QSizePolicy.PushButton, QtCore.Qt.Vertical)
-            nextX = x + item.sizeHint().width() + spaceX
-            if nextX - spaceX > rect.right() and lineHeight > 0:
+        for item, (width, height, spaceX, spaceY) in zip(self.itemList, self.itemGeometry()):
+            nextX = x + width + spaceX
+            if nextX - spaceX > right and lineHeight > 0:
                 x = rect.x()
                 y = y + lineHeight + spaceY
-                nextX = x + item.sizeHint().width() + spaceX
+                nextX = x + width + spaceX
                 lineHeight = 0
 
             if not testOnly:
-                item.setGeometry(QtCore.QRect(QtCore.QPoint(x, y), item.sizeHint()))
+                item.setGeometry(QtCore.QRect(x, y, width, height))
 
             x = nextX
-            lineHeight = max(lineHeight, item.sizeHint().height())
+            lineHeight = max(lineHeight, height)
 
         return y + lineHeight - rect.y()
 
@@ -156,10 +268,10 @@ class ResizeScrollArea(QtGui.QScrollArea):
 
 
     def resizeEvent(self, event):
-        wrapper = self.findChild(QtGui.QWidget)
-        flow = wrapper.findChild(FlowLayout)
+        wrapper = self.widget()
+        flow = wrapper.layout() if wrapper else None
         
-        if wrapper and flow:            
+        if isinstance(flow, FlowLayout):
             width = self.viewport().width()
             height = flow.heightForWidth(width)
             size = QtCore.QSize(width, height)
@@ -195,8 +307,120 @@ class ScrollingFlowWidget(QtGui.QWidget):
         self.flowLayout.addWidget(widget)
         widget.setParent(self._wrapper)
 
+    """ Adds a batch of widgets with painting and layout held off - the flow is laid out once at the end rather than per widget """
+    def addWidgets(self, widgets):
+        self._wrapper.setUpdatesEnabled(False)
+        self.flowLayout.setEnabled(False)
+        try:
+            self.flowLayout.addWidgets(widgets)
+        finally:
+            self.flowLayout.setEnabled(True)
+            self.flowLayout.invalidate()
+            self._wrapper.setUpdatesEnabled(True)
+
     def getChildren(self):
         return self.flowLayout.itemLis
+
+    """ Replaces the flowed widgets with widgets - in that order - widgets already in the flow are reused """
+    def setWidgets(self, widgets):
+        while self.flowLayout.takeAt(0) is not None:
+            pass
+        self.addWidgets(widgets)
+
+""" A list model of script icons for IconGridView - pixmaps are only fetched for rows the view actually paints """
+class IconListModel(QtCore.QAbstractListModel):
+    CommandRole = QtCore.Qt.UserRole
+    CommandTypeRole = QtCore.Qt.UserRole + 1
+    KeyRole = QtCore.Qt.UserRole + 2
+
+    def __init__(self, icons, parent=None):
+        """
+            icons - list of icon_info - the tools' ScriptInfo()s
+        """
+        super(IconListModel, self).__init__(parent)
+        self.setIcons(icons)
+
+    """ Swaps the icons shown - ie after a live refresh """
+    def setIcons(self, icons):
+        self.beginResetModel()
+        self.icons = [get_iconDisplayInfo(icon_info) for icon_info in icons]
+        self.keys = [getattr(icon_info, 'key', None) for icon_info in icons]
+        self._pixmaps = OrderedDict() # row: pixmap - most recently painted last
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.icons)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.icons):
+            return None
+        icon, command, tooltip, image, command_type = self.icons[index.row()]
+        if role == QtCore.Qt.DecorationRole:
+            # only the rows on screen are kept - repaints skip the shared cache's mtime lookup without pinning every pixmap ever painted
+            pixmap = self._pixmaps.pop(index.row(), None)
+            if pixmap is None:
+                pixmap = get_iconPixmap(icon, image=image)
+            self._pixmaps[index.row()] = pixmap
+            while len(self._pixmaps) > MODEL_PIXMAP_ROWS:
+                self._pixmaps.popitem(last=False)
+            return pixmap
+        if role == QtCore.Qt.ToolTipRole:
+            return tooltip
+        if role == self.CommandRole:
+            return command
+        if role == self.CommandTypeRole:
+            return command_type
+        if role == self.KeyRole:
+            return self.keys[index.row()]
+        return None
+
+    def flags(self, index):
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsDragEnabled
+
+    def mimeTypes(self):
+        return ['text/plain']
+
+    """ Dragging an icon to the shelf hands Maya the command as text - same as IconLabelWidget """
+    def mimeData(self, indexes):
+        mimedata = QtCore.QMimeData()
+        if indexes:
+            mimedata.setText(self.icons[indexes[0].row()][1])
+        return mimedata
+
+"""A virtualized alternative to ScrollingFlowWidget + IconLabelWidgets - one view paints every icon so only the visible ones cost anything"""
+class IconGridView(QtGui.QListView):
+    """
+    Flows the icons left to right and wraps them like FlowLayout, with the same tooltips, click to run and drag to shelf.
+    No widget is created per icon.
+    """
+
+    def __init__(self, icons, parent=None):
+        super(IconGridView, self).__init__(parent)
+        self.setViewMode(QtGui.QListView.IconMode)
+        self.setFlow(QtGui.QListView.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QtGui.QListView.Adjust)
+        self.setMovement(QtGui.QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QtGui.QListView.Batched)
+        self.setIconSize(QtCore.QSize(32, 32))
+        self.setGridSize(QtCore.QSize(38, 38))
+        self.setSelectionMode(QtGui.QAbstractItemView.SingleSelection)
+        self.setDragEnabled(True)
+        self.setDragDropMode(QtGui.QAbstractItemView.DragOnly)
+        self.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.setMinimumSize(QtCore.QSize(0, 80))
+
+        self.setModel(IconListModel(icons, self))
+        self.clicked.connect(self.runIndexCommand)
+
+    """ Runs the command for the clicked icon """
+    def runIndexCommand(self, index):
+        model = self.model()
+        dispatch_command(model.data(index, IconListModel.CommandRole), model.data(index, IconListModel.CommandTypeRole), tool=model.data(index, IconListModel.KeyRole))
  
 """A QGroupBox which collapses when unchecked."""
 class CollapsableGroup(QtGui.QGroupBox):
@@ -251,33 +475,145 @@ class TextBubble(QtGui.QLabel):
             0, 0, self.width() - 1, self.height() - 1, 5, 5)
         super(TextBubble, self).paintEvent(event)
 
+""" Collapsed panel totalling the tracing spans - only added to the toolbox while tracing is on (see tracing.py) """
+class TraceSummaryWidget(CollapsableGroup):
+    def __init__(self, parent=None):
+        CollapsableGroup.__init__(self, 'Trace', parent, checkState=False)
+        layout = QtGui.QVBoxLayout(self)
+        self.tree = QtGui.QTreeWidget()
+        self.tree.setHeaderLabels(['Span', 'Count', 'Total ms', 'Max ms'])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setSortingEnabled(True)
+        layout.addWidget(self.tree)
+
+        buttons = QtGui.QHBoxLayout()
+        refresh_btn = QtGui.QPushButton('Refresh')
+        refresh_btn.clicked.connect(self.refresh)
+        buttons.addWidget(refresh_btn)
+        save_btn = QtGui.QPushButton('Save Trace...')
+        save_btn.clicked.connect(self.saveTrace)
+        buttons.addWidget(save_btn)
+        layout.addLayout(buttons)
+        self.toggled.connect(self.refresh)
+
+    """ Re-totals the spans recorded so far """
+    def refresh(self, *args):
+        self.tree.setSortingEnabled(False)
+        self.tree.clear()
+        for name, count, total, longest in tracing.summary():
+            item = QtGui.QTreeWidgetItem(self.tree)
+            item.setText(0, name)
+            item.setData(1, QtCore.Qt.DisplayRole, count)
+            item.setData(2, QtCore.Qt.DisplayRole, round(total, 2))
+            item.setData(3, QtCore.Qt.DisplayRole, round(longest, 2))
+        self.tree.setSortingEnabled(True)
+        self.tree.sortByColumn(2, QtCore.Qt.DescendingOrder)
+
+    """ Writes the Chrome trace file somewhere the user picks """
+    def saveTrace(self):
+        path = QtGui.QFileDialog.getSaveFileName(self, 'Save Trace', 'toolbox_trace.json', 'Trace (*.json)')
+        if isinstance(path, tuple): # PySide hands back (path, filter)
+            path = path[0]
+        if path:
+            tracing.save(path)
+
+""" Collapsed panel listing the tools with a missing icon or a broken manifest - hidden while there aren't any (see missingpaths.py) """
+class BrokenToolsWidget(CollapsableGroup):
+    def __init__(self, parent=None):
+        CollapsableGroup.__init__(self, 'Broken Tools', parent, checkState=False)
+        layout = QtGui.QVBoxLayout(self)
+        self.tree = QtGui.QTreeWidget()
+        self.tree.setHeaderLabels(['Tool', 'Problem', 'Path'])
+        self.tree.setRootIsDecorated(False)
+        layout.addWidget(self.tree)
+        self.hide()
+
+    """ Re-reads the report """
+    def refresh(self):
+        report = missingpaths.get_missing_paths().report()
+        self.tree.clear()
+        for tool, problem, path in report:
+            QtGui.QTreeWidgetItem(self.tree, [tool or '', problem, path or ''])
+        self.setTitle('Broken Tools (%d)' % len(report))
+        self.setVisible(bool(report))
+
 """ A QTabWidget that will hold the tabs for projects - Should be broken down more but eh"""
 class TypeWidget(QtGui.QWidget): # Tabs are the Project
+    shelfRequested = Signal(str, object) # group title, [ScriptInfo()]
+
     """Initialize the TabWidget(QtGui.QTabWidget):"""
-    def __init__(self, tab, title, icons, parent=None):
+    def __init__(self, tab, title, icons, parent=None, virtualized=False):
+        """
+            virtualized - show the icons in an IconGridView rather than a widget per icon
+        """
         super(TypeWidget, self).__init__(parent)
 
         self.tasktype_grpbxlayout = QtGui.QVBoxLayout(self)
+        self.title = title
         self.titleBubble = TextBubble(title)
         self.titleBubble.setMinimumSize(64, 20)
-        self.tasktype_scroll = ScrollingFlowWidget()
-        # Create the icons widgets
-        icon_objects = []
-        for icon_info in icons:
-   
-            label = IconLabelWidget(icon_info=icon_info)
-            self.tasktype_scroll.addWidget(label)
+        self.virtualized = virtualized
+        self.icons = list(icons)
+        self.icon_widgets = list()
+        if virtualized:
+            self.tasktype_scroll = IconGridView(icons)
+        else:
+            self.tasktype_scroll = ScrollingFlowWidget()
+            # Create the icons widgets - flowed in one go
+            self.icon_widgets = [IconLabelWidget(icon_info=icon_info) for icon_info in icons]
+            self.tasktype_scroll.addWidgets(self.icon_widgets)
             
         self.tasktype_grpbxlayout.addWidget(self.titleBubble)    
         self.tasktype_grpbxlayout.addWidget(self.tasktype_scroll)
 
+    """ Updates the group to show icons - only icons that are new or edited get a new IconLabelWidget """
+    def setIcons(self, icons):
+        self.icons = list(icons)
+        if self.virtualized:
+            self.tasktype_scroll.model().setIcons(icons)
+            return
+
+        old_widgets = dict((id(label.icon_info), label) for label in self.icon_widgets)
+        labels = list()
+        for icon_info in icons:
+            label = old_widgets.pop(id(icon_info), None)
+            if label is None:
+                label = IconLabelWidget(icon_info=icon_info)
+            labels.append(label)
+
+        for label in old_widgets.values():
+            label.setParent(None)
+            label.deleteLater()
+
+        self.tasktype_scroll.setWidgets(labels)
+        self.icon_widgets = labels
+
+    """ Right click offers the whole group as a shelf - saves dragging the icons over one at a time """
+    def contextMenuEvent(self, event):
+        if not self.icons:
+            return
+        menu = QtGui.QMenu(self)
+        shelf_action = menu.addAction('Make Shelf from %s (%d tools)' % (self.title, len(self.icons)))
+        if menu.exec_(event.globalPos()) == shelf_action:
+            self.shelfRequested.emit(self.title, list(self.icons))
+
         
 """ A QTabWidget that will hold the tabs for projects - Should be broken down more but eh"""
 class TabWidget(QtGui.QTabWidget): # Tabs are the Project
+    shelfRequested = Signal(str, object) # shelf name, [ScriptInfo()]
+
     """Initialize the TabWidget(QtGui.QTabWidget):"""
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, prebuild_adjacent=True, virtualized=False):
+        """
+            prebuild_adjacent - build the tabs either side of the current one when the UI is idle so switching to them is instant
+            virtualized - TypeWidgets use an IconGridView rather than a widget per icon
+        """
         super(TabWidget, self).__init__(parent)
         self.tabs = list()
+        self.prebuild_adjacent = prebuild_adjacent
+        self.virtualized = virtualized
+        self.usage_counts = dict() # tool folder: runs - most used icons go first in each group
+        self.recent_tools = list() # tool folders - most recently run first
         
         '''
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
@@ -287,24 +623,177 @@ class TabWidget(QtGui.QTabWidget): # Tabs are the Project
         self.setSizePolicy(sizePolicy)
         '''
         self.setMinimumSize(200, 200)
+
+    """ Adds a project tab as a lightweight placeholder - its TypeWidgets get built the first time it is shown (see buildTab) """
     def addNewTab(self, collapse_groups, title):
+        with tracing.span('addNewTab', title=title):
+            self._addNewTab(collapse_groups, title)
+
+    def _addNewTab(self, collapse_groups, title):
         new_tab_wid = QtGui.QWidget()
         new_tab_wid.setContentsMargins(-10, -10, -10, -10)
-        self.layout = QtGui.QVBoxLayout(self)
+        # Hidden tabs don't count towards the tab widget's size - curTabChange swaps this on the tab being shown
+        new_tab_wid.setSizePolicy(QtGui.QSizePolicy.Ignored, QtGui.QSizePolicy.Ignored)
+        self.layout = QtGui.QVBoxLayout(new_tab_wid)
         self.layout.setSpacing(0)
-        
-        self.addTab(new_tab_wid, title)
-        self.setTabText(len(self.tabs), title)        
-        
-        new_tab_wid.setLayout(self.layout)
-        splitter = QtGui.QSplitter(QtCore.Qt.Vertical)
-        for key, value in collapse_groups.items():
-            type_group = TypeWidget(new_tab_wid, key, value)
-            splitter.addWidget(type_group)
-            
-        self.layout.addWidget(splitter)
-        
+        new_tab_wid.collapse_groups = collapse_groups # pending until the tab is built
+        new_tab_wid.project = title
+        new_tab_wid.type_widgets = dict()
         self.tabs.append(new_tab_wid)
+        
+        # Adding the first tab makes it current which builds it through curTabChange
+        index = self.addTab(new_tab_wid, title)
+        self.setTabText(index, title)
+        if self.prebuild_adjacent and index == self.currentIndex() + 1:
+            QtCore.QTimer.singleShot(0, lambda: self.buildTab(index))
+
+    """ Builds the splitter and TypeWidgets for a placeholder tab - does nothing if it is already built """
+    def buildTab(self, index):
+        if index < 0 or index >= len(self.tabs):
+            return
+        tab_wid = self.tabs[index]
+        collapse_groups = tab_wid.collapse_groups
+        if collapse_groups is None:
+            return
+        tab_wid.collapse_groups = None
+
+        with tracing.span('buildTab', title=tab_wid.project):
+            # The groups go into the splitter before it goes into the tab so the tab only lays out and paints once
+            tab_wid.setUpdatesEnabled(False)
+            try:
+                splitter = QtGui.QSplitter(QtCore.Qt.Vertical)
+                tab_wid.splitter = splitter
+                tab_wid.recent_widget = None
+                self.updateRecent(tab_wid, collapse_groups)
+                for key, value in collapse_groups.items():
+                    type_group = TypeWidget(tab_wid, key, self.orderIcons(value), virtualized=self.virtualized)
+                    self.connectShelfRequests(tab_wid, type_group)
+                    splitter.addWidget(type_group)
+                    tab_wid.type_widgets[key] = type_group
+
+                tab_wid.layout().addWidget(splitter)
+            finally:
+                tab_wid.setUpdatesEnabled(True)
+
+    """ Sets the usage the tabs are ordered by - only tabs built after this use it """
+    def setUsage(self, usage_counts, recent_tools):
+        self.usage_counts = usage_counts or dict()
+        self.recent_tools = recent_tools or list()
+
+    """ Most used icons first - icons used equally keep their order """
+    def orderIcons(self, icons):
+        if not self.usage_counts:
+            return icons
+        return sorted(icons, key=lambda icon_info: -self.usage_counts.get(getattr(icon_info, 'key', None), 0))
+
+    """ The project's most recently run tools """
+    def recentIcons(self, collapse_groups):
+        by_key = dict()
+        for icons in collapse_groups.values():
+            for icon_info in icons:
+                by_key[getattr(icon_info, 'key', None)] = icon_info
+        return [by_key[key] for key in self.recent_tools if key in by_key][:RECENT_LIMIT]
+
+    """ Shows the project's recent tools in a strip above its type groups - no strip if none of them have been run """
+    def updateRecent(self, tab_wid, collapse_groups):
+        icons = self.recentIcons(collapse_groups)
+        if tab_wid.recent_widget is not None:
+            tab_wid.recent_widget.setIcons(icons)
+            tab_wid.recent_widget.setVisible(bool(icons))
+        elif icons:
+            tab_wid.recent_widget = TypeWidget(tab_wid, 'Recent', icons, virtualized=self.virtualized)
+            self.connectShelfRequests(tab_wid, tab_wid.recent_widget)
+            tab_wid.splitter.insertWidget(0, tab_wid.recent_widget)
+
+    """ Passes a type group's shelf requests on - named after the project and group """
+    def connectShelfRequests(self, tab_wid, type_group):
+        type_group.shelfRequested.connect(lambda title, icons: self.shelfRequested.emit('%s %s' % (tab_wid.project, title), icons))
+
+    """ Every tool in a project tab - a tool in several of its type groups is only listed once """
+    def projectIcons(self, index):
+        tab_wid = self.tabs[index]
+        if tab_wid.collapse_groups is not None: # not built yet
+            groups = [self.orderIcons(tab_wid.collapse_groups[type]) for type in sorted(tab_wid.collapse_groups)]
+        else:
+            groups = [tab_wid.type_widgets[type].icons for type in sorted(tab_wid.type_widgets)]
+        icons = list()
+        seen = set()
+        for group in groups:
+            for icon_info in group:
+                if id(icon_info) not in seen:
+                    seen.add(id(icon_info))
+                    icons.append(icon_info)
+        return icons
+
+    """ Right click on a project's tab (or an empty bit of it) offers the whole project as a shelf """
+    def contextMenuEvent(self, event):
+        index = self.tabBar().tabAt(self.tabBar().mapFrom(self, event.pos()))
+        if index < 0:
+            index = self.currentIndex()
+        if index < 0 or index >= len(self.tabs):
+            return
+        icons = self.projectIcons(index)
+        if not icons:
+            return
+        project = self.tabs[index].project
+        menu = QtGui.QMenu(self)
+        shelf_action = menu.addAction('Make Shelf from %s (%d tools)' % (project, len(icons)))
+        if menu.exec_(event.globalPos()) == shelf_action:
+            self.shelfRequested.emit(project, icons)
+
+    """ Index of a project's tab - -1 if there isn't one """
+    def indexOfProject(self, project):
+        for index, tab_wid in enumerate(self.tabs):
+            if tab_wid.project == project:
+                return index
+        return -1
+
+    """ Removes a project's tab """
+    def removeProjectTab(self, index):
+        # currentChanged fires inside removeTab and builds the new current tab from self.tabs - it has to be gone from there first
+        tab_wid = self.tabs.pop(index)
+        self.removeTab(index)
+        tab_wid.deleteLater()
+
+    """ Brings the given type groups of a tab up to date with collapse_groups """
+    def updateTab(self, index, collapse_groups, types):
+        tab_wid = self.tabs[index]
+        if tab_wid.collapse_groups is not None:
+            # Not built yet - it just gets built from the new groups when it is shown
+            tab_wid.collapse_groups = collapse_groups
+            return
+
+        tab_wid.setUpdatesEnabled(False) # one repaint for every group the refresh touched
+        try:
+            self._updateTypes(tab_wid, collapse_groups, types)
+        finally:
+            tab_wid.setUpdatesEnabled(True)
+
+    def _updateTypes(self, tab_wid, collapse_groups, types):
+        self.updateRecent(tab_wid, collapse_groups)
+        for type in types:
+            icons = self.orderIcons(collapse_groups.get(type) or list())
+            type_group = tab_wid.type_widgets.get(type)
+            if type_group is None:
+                if icons:
+                    type_group = TypeWidget(tab_wid, type, icons, virtualized=self.virtualized)
+                    self.connectShelfRequests(tab_wid, type_group)
+                    tab_wid.splitter.addWidget(type_group)
+                    tab_wid.type_widgets[type] = type_group
+            elif not icons:
+                del tab_wid.type_widgets[type]
+                type_group.setParent(None)
+                type_group.deleteLater()
+            else:
+                type_group.setIcons(icons)
+
+    """ Makes sure the shown tab is built and queues its neighbours for idle time """
+    def showTab(self, index):
+        self.buildTab(index)
+        if self.prebuild_adjacent:
+            # zero timeouts only run once the event loop has nothing else to do
+            QtCore.QTimer.singleShot(0, lambda: self.buildTab(index + 1))
+            QtCore.QTimer.singleShot(0, lambda: self.buildTab(index - 1))
 
 
 """Creates a Widget to hold information about the script and icon for the user to drag from the UI and drop to the shelf"""
@@ -314,6 +803,7 @@ class IconLabelWidget(QtGui.QWidget):
     def __init__(self, parent=None, icon_info=None):
         super(IconLabelWidget, self).__init__(parent)
         
+        self.icon_info = icon_info
         self.initUIIconLabel(parent, icon_info)
         self.setFixedWidth(32)
         self.setFixedHeight(32)
@@ -329,42 +819,26 @@ class IconLabelWidget(QtGui.QWidget):
         self.layout.setAlignment(self, QtCore.Qt.AlignHCenter)
         self.user_icon_path = os.path.dirname(os.path.realpath(__file__)).replace("\\","/")
         
-        try:
-            icon = icon_info.get('icon')
-            command = icon_info.get('command')
-            tooltip = icon_info.get('tooltip')
-        except:
-            icon = "%s/icon_error.jpg"%self.user_icon_path
-            command = 'ERROR'
-            tooltip = 'ERROR'
-            
-        # For now - need something better
-        if icon  == None or command  == None or tooltip  == None:
-            icon = "%s/icon_error.jpg"%self.user_icon_path
-            command = 'ERROR'
-            tooltip = 'ERROR'
-            print 'Something has gone wrong with a script pack in icons'
+        icon, command, tooltip, image, command_type = get_iconDisplayInfo(icon_info)
             
-        # Turn Icons into a proper widget object
-        self.icon = QtGui.QPixmap(icon)
-        self.command_text = str(command)
+        # Turn Icons into a proper widget object - shared so each icon is only decoded once
+        self.icon = get_iconPixmap(icon, image=image)
+        self.command_text = command
+        self.command_type = command_type
         
         self.label = QtGui.QLabel('', parent)
         self.label.setToolTip(tooltip)
         
-        self.icon.scaled(32, 32, QtCore.Qt.KeepAspectRatio)
+        # already scaled down to 32x32 by the thumbnail cache
         self.label.setPixmap(self.icon)
 
         
         self.label.show()
         self.layout.addWidget(self.label)
         self.setLayout(self.layout)
-    def runMayaCommand(self): # TEMP needs more robust run command for click
-        print self.command_text;
-        try:
-            exec(self.command_text)
-        except:
-            print 'Sorry only python commands are currently supported on a click basis. Please feel free to drag the icon to the shelf to make a shelf button'
+    """ Queues the icon's command - it runs once the click has been painted """
+    def runMayaCommand(self):
+        dispatch_command(self.command_text, self.command_type, tool=getattr(self.icon_info, 'key', None))
             
     """Mouse Press event for drag drpo functionality for TabWidget(QtGui.QTabWidget):"""   
     def mouseReleaseEvent(self, event):
@@ -386,20 +860,153 @@ class IconLabelWidget(QtGui.QWidget):
         mimedata = QtCore.QMimeData()
         mimedata.setText(self.command_text)
         drag.setMimeData(mimedata)
-        painter = QtGui.QPainter(self.icon) #(int x, int y, int w, int h, const QPixmap &pixmap, int sx, int sy, int sw, int sh
+        drag_icon = self.icon.copy() # self.icon is shared through the icon cache so don't paint on it
+        painter = QtGui.QPainter(drag_icon) #(int x, int y, int w, int h, const QPixmap &pixmap, int sx, int sy, int sw, int sh
         #painter.drawPixmap(self.rect(), self.grab())
         painter.drawPixmap(0, 0, 20, 20, self.icon, 20, 20, 20, 20)
         painter.end()
-        drag.setPixmap(self.icon)
+        drag.setPixmap(drag_icon)
         drag.setHotSpot(event.pos())
         drag.exec_(QtCore.Qt.CopyAction | QtCore.Qt.MoveAction)
 
+""" Pulls what an icon needs to display out of its icon_info - anything broken gets the error icon """
+def get_iconDisplayInfo(icon_info):
+    """
+        icon_info - the tool's ScriptInfo() - its image is set once the background loader has decoded the icon
+
+        Returns: (icon path, command string, tooltip, QImage or None, command_type)
+    """
+    user_icon_path = os.path.dirname(os.path.realpath(__file__)).replace("\\","/")
+    try:
+        icon = icon_info.icon
+        command = icon_info.command
+        tooltip = icon_info.tooltip
+        image = icon_info.image # already decoded by the background loader
+        command_type = icon_info.command_type
+    except:
+        icon = "%s/icon_error.jpg"%user_icon_path
+        command = 'ERROR'
+        tooltip = 'ERROR'
+        image = None
+        command_type = None
+
+    # Icons missing on the share (or that won't decode) get the error icon straight away rather than a blank label
+    key = getattr(icon_info, 'key', None)
+    if icon and ((image is not None and image.isNull()) or (image is None and missingpaths.get_missing_paths().is_missing(icon))):
+        missingpaths.get_missing_paths().set_broken(key, 'icon', icon, 'icon missing or unreadable')
+        icon = "%s/icon_error.jpg"%user_icon_path
+        image = None
+    elif key is not None and image is not None:
+        missingpaths.get_missing_paths().clear_broken(key, 'icon')
+        
+    # For now - need something better
+    if icon  == None or command  == None or tooltip  == None:
+        icon = "%s/icon_error.jpg"%user_icon_path
+        command = 'ERROR'
+        tooltip = 'ERROR'
+        image = None
+        command_type = None
+        print 'Something has gone wrong with a script pack in icons'
+
+    return icon, str(command), tooltip, image, command_type
+
+""" An icon's pixmap from the shared cache - the error icon if it can't be read (missingpaths remembers it for next time) """
+def get_iconPixmap(icon, image=None):
+    pixmap = iconcache.get_icon_cache().pixmap(icon, image=image)
+    if pixmap.isNull():
+        user_icon_path = os.path.dirname(os.path.realpath(__file__)).replace("\\","/")
+        pixmap = iconcache.get_icon_cache().pixmap("%s/icon_error.jpg"%user_icon_path)
+    return pixmap
+
+""" Runs an icon's command straight away - clicks go through dispatch_command """
+def run_command(command_text, command_type=None, tool=None):
+    """
+        tool - the tool's script folder - the run is recorded in the usage log against it
+
+        Return: False if the command raised
+    """
+    print command_text;
+    started = time.time()
+    success = True
+    try:
+        with tracing.span('run_command', command=command_text):
+            commandcache.run_command(command_text, command_type)
+    except:
+        success = False
+        print 'Sorry only python commands are currently supported on a click basis. Please feel free to drag the icon to the shelf to make a shelf button'
+    usagelog.get_usage_log().record(tool, started, time.time() - started, success)
+    return success
+
+""" Queues an icon's command to run when the application is idle - shared by IconLabelWidget and IconGridView """
+def dispatch_command(command_text, command_type=None, tool=None):
+    """
+        Return: False if the same tool is already queued/running or was only just clicked
+    """
+    return commanddispatch.get_command_dispatcher().dispatch(tool or command_text, lambda: run_command(command_text, command_type, tool=tool))
+
+""" Wait cursor while a clicked tool runs - put back as soon as the tool shows a modal window so its dialog doesn't look busy """
+class BusyCursor(QtCore.QObject):
+    def __init__(self, parent=None):
+        super(BusyCursor, self).__init__(parent)
+        self.active = False
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        QtGui.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        QtGui.QApplication.instance().installEventFilter(self) # only sees events while the tool spins an event loop (ie a modal dialog)
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+        QtGui.QApplication.instance().removeEventFilter(self)
+        QtGui.QApplication.restoreOverrideCursor()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Show and isinstance(obj, QtGui.QWidget) and obj.isWindow() and obj.windowModality() != QtCore.Qt.NonModal:
+            self.stop() # the tool is waiting on the artist now, not the other way round
+        return False
+
+""" Shows a busy cursor and status message on the window while a clicked tool runs """
+def connect_commandStatus(window, controller):
+    window.controller = controller # teardown releases its dispatcher connections
+    busy_cursor = BusyCursor(window)
+    def onstarted(tool):
+        window.statusBar().showMessage('Running %s...' % tool)
+        busy_cursor.start()
+    def onfinished(tool, success):
+        busy_cursor.stop()
+        if success:
+            window.statusBar().clearMessage()
+        else:
+            window.statusBar().showMessage('%s failed - see the script editor' % tool, 5000)
+    controller.commandStarted.connect(onstarted)
+    controller.commandFinished.connect(onfinished)
+
+""" (runs per tool, recently run tools) from the usage log - what the tabs are ordered by """
+def load_usage():
+    log = usagelog.get_usage_log()
+    return log.counts(), log.recent(RECENT_HISTORY)
+
 """ Main Dialog entry point for creating the UI MainScriptsShareWidget(QtGui.QDialog)"""
 class MainScriptsShareWidget(QtGui.QWidget):
+    shelfRequested = Signal(str, object) # shelf name, [ScriptInfo()]
 
     """Init for MainScriptsShareWidget(QtGui.QDialog)"""
-    def __init__(self, parent, scripts_uibuildinfo):
+    def __init__(self, parent, scripts_uibuildinfo=None, virtualized=False):
+        """
+            scripts_uibuildinfo - WindowUIBuildInfo() to build every tab from - None starts empty in a loading state and tabs come in through addProjectTab
+            virtualized - show icons in IconGridViews rather than a widget per icon
+        """
         super(MainScriptsShareWidget, self).__init__(parent)
+        self.virtualized = virtualized
+        self.scripts_uibuildinfo = scripts_uibuildinfo
+        self.watcher = None
+        self.prewarmer = None
+        self.shown_tab = None # the tab page curTabChange last showed
+        self.prewarm_usage = None
         self.initUIMain(parent,scripts_uibuildinfo)
         
         
@@ -407,185 +1014,183 @@ class MainScriptsShareWidget(QtGui.QWidget):
     def initUIMain(self, parent, scripts_uibuildinfo):
         # Fix this QLayout: Attempting to add QLayout "" to MainScriptsShareWidget "", which already has a layout - it works as expected but says that 
         layout_main = QtGui.QVBoxLayout(self)
-        self.tabs_wdgt = TabWidget()
+        self.search_edit = QtGui.QLineEdit()
+        self.search_edit.setPlaceholderText('Search tools...')
+        # Searches once typing pauses rather than on every keystroke
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE)
+        self._search_timer.timeout.connect(lambda: self.searchChanged(self.search_edit.text()))
+        self.search_edit.textChanged.connect(self._search_timer.start)
+        layout_main.addWidget(self.search_edit)
+        self.loading_lbl = QtGui.QLabel('Loading tools...')
+        self.loading_lbl.setAlignment(QtCore.Qt.AlignCenter)
+        layout_main.addWidget(self.loading_lbl)
+        self.tabs_wdgt = TabWidget(virtualized=self.virtualized)
+        self.tabs_wdgt.setUsage(*load_usage())
         layout_main.addWidget(self.tabs_wdgt)
         self.tabs_wdgt.currentChanged.connect(self.curTabChange)
+        self.tabs_wdgt.shelfRequested.connect(self.shelfRequested)
+        # Search results flow in one group over the top of the tabs so the tabs never get rebuilt
+        # Always an IconGridView - results change every search so a widget per icon would be rebuilt each time
+        self.search_results = TypeWidget(self, 'Search results', list(), virtualized=True)
+        self.search_results.shelfRequested.connect(self.shelfRequested)
+        self.search_results.hide()
+        layout_main.addWidget(self.search_results)
+        self.broken_tools = BrokenToolsWidget(self)
+        layout_main.addWidget(self.broken_tools)
+        self.trace_summary = None
+        if tracing.is_enabled():
+            self.trace_summary = TraceSummaryWidget(self)
+            layout_main.addWidget(self.trace_summary)
         
-        # Go through and create all the tabs and gubbins
-        for key, value in scripts_uibuildinfo.ui_build_info.items():
-            # Add in all of the tabs - will be based on folder structure
-            self.tabs_wdgt.addNewTab(collapse_groups=value, title=key)
-            #layout_main.addWidget( self.tab) 
+        if scripts_uibuildinfo is None:
+            self.tabs_wdgt.hide()
+            self.search_edit.setEnabled(False)
+        else:
+            self.loading_lbl.hide()
+            # Go through and create all the tabs and gubbins
+            for key, value in scripts_uibuildinfo.ui_build_info.items():
+                # Add in all of the tabs - will be based on folder structure
+                self.addProjectTab(key, value)
+            self.broken_tools.refresh()
 
         #self.setLayout(layout_main)
         self.setWindowTitle('Drag and Drop shelf buttons')
 
-    def curTabChange(self, index):
-        for i in range(self.tabs_wdgt.count()):
-            if i == index:
-                self.tabs_wdgt.widget(i).setSizePolicy(QtGui.QSizePolicy.Preferred, QtGui.QSizePolicy.Preferred)
-            else:
-                self.tabs_wdgt.widget(i).setSizePolicy(QtGui.QSizePolicy.Ignored, QtGui.QSizePolicy.Ignored)
+    """ Adds one project tab - the background loader calls this as each tab is ready """
+    def addProjectTab(self, title, collapse_groups):
+        self.loading_lbl.hide()
+        if not self.search_results.isVisible():
+            self.tabs_wdgt.show()
+        self.tabs_wdgt.addNewTab(collapse_groups=collapse_groups, title=title)
 
-""" Class to bundle the information on the script """
-class ScriptInfo():
-    """Init for ScriptInfo(): """
-    def __init__(self, json_path=None, program=None):
-        """
-            json_path: full path to the json that contains the run command information
+    """ Called once the background loader has sent every tab """
+    def loadingFinished(self, scripts_uibuildinfo=None, error=None):
         """
-        self.command = ''
-        self.icon = ''
-        self.tooltip = ''
-        self.parent_projects = list()
-        self.parent_types = list()
-        self.program = program
-        self.command_type = ''
-        
-        dir_head, dir_tail = os.path.split(json_path)
-        
-        if dir_tail[:2] != '__' and os.path.isdir(json_path):
-            scripts_info = self.get_scriptInfoJson(json_path, program=self.program) # This hsould be turned into setters/getters but for now - this
-            self.command = scripts_info.get('command')
-            self.icon = scripts_info.get('icon')
-            self.tooltip = scripts_info.get('tooltip')
-            self.parent_projects = scripts_info.get('parent_projects')
-            self.parent_types = scripts_info.get('parent_types')
-            self.command_type = scripts_info.get('command_type')
-
-    """ Gets the information from the script info .json """
-    def get_scriptInfoJson(self, path, program):
+            error - what stopped the loader - any tabs that made it over stay up
         """
-        path - full directory path to the json file with the script run information
-        
-        Returns: dictionary with the json information
-        """
-        json_file = os.path.join(path, 'scriptInformation_' + program + '.json')
-        content = dict()
-        if os.path.isfile(json_file):
-            with open(json_file) as json_file:  
-                content = json.load(json_file)
-
-        return content
-        
-    """ Generates the .json file that holds the script information """
-    def generate_scriptInfoJson(self, path, command, icon_path, tooltip, parent_projectlist, parent_typelist):
-        """
-            path - path to where the json run command script information document well be placed
-            program - valid programs for this tool
-            command - the text that will be placed on Maya's command shelf
-            icon_path - the path to the icon jpg
-            tooltip - a tooltip string when someone hovers over the icon
-            parent_projectlist - list of all projects you want this script to be placed under in the UI
-            parent_typelist - list of all types you want this script to be placed under in the UI
-        """
-        content = {'command': command, 'icon':icon_path, 'tooltip':tooltip, 'parent_projects':parent_projectlist, 'parent_types':parent_typelist}
-        with open(os.path.join(path, 'scriptInformation.json'), 'w') as f:
-                    json.dump(content, f, indent=4, sort_keys=True)
-                    f.close()
-
-#class WindowUITabInfo():
-
-#class WindowUIGroupInfo():
-
-""" To bundle in the list of ScriptInfo()s and the Final UI Build Information for those Scripts """
-class WindowUIBuildInfo():
-    """Init for ScriptsUIBuild(): """
-    def __init__(self, full_path=None, program=None):
+        if scripts_uibuildinfo is not None:
+            self.scripts_uibuildinfo = scripts_uibuildinfo
+            self.search_edit.setEnabled(True)
+        if self.tabs_wdgt.count():
+            self.loading_lbl.hide()
+        elif error is not None:
+            self.loading_lbl.setText('Sorry, the tools could not be loaded:\n%s' % error)
+        else:
+            self.loading_lbl.setText('Sorry, there is no build information for this ui.')
+        self.broken_tools.refresh()
+        if self.prewarmer is not None and self.scripts_uibuildinfo is not None:
+            self.prewarmer.start(self.scripts_uibuildinfo, usage=self.prewarmUsage())
+
+    """ Usage the pre-warmer orders modules by - the usage log's unless prewarmModules was handed some """
+    def prewarmUsage(self):
+        if self.prewarm_usage is not None:
+            return self.prewarm_usage
+        return self.tabs_wdgt.usage_counts
+
+    """ Imports the modules the tools' commands use while the application is idle so first clicks don't freeze (see prewarm.py) - starts once the tools have loaded """
+    def prewarmModules(self, defer=None, usage=None):
         """
-            full_path: full path to the directory where the script directories are
+            defer - runs a callable when the application is idle (ie maya.utils.executeDeferred) - defaults to a Qt idle timer
+            usage - {tool folder: times used} - the most used tools' modules go first - defaults to the usage log
         """
-        
-        self.ui_build_info = dict() # Quick and dirty - shoudl be more robust/refactored
-        self.script_infos = list()
-        self.scripts_path = full_path
-        self.program = program
-
-        if os.path.isdir(full_path):
-            self.generate_UIBuildInfo()
-
-    """ Takes a path and sorts a list of ScriptInfo()s that you want to uses in the UI building process & creates a build info dict - needs refactor/cleanup """
-    def generate_UIBuildInfo(self):
+        if self.prewarmer is None:
+            self.prewarmer = prewarm.PrewarmScheduler(defer=defer, parent=self)
+        self.prewarm_usage = usage
+        if self.scripts_uibuildinfo is not None:
+            self.prewarmer.start(self.scripts_uibuildinfo, usage=self.prewarmUsage())
+        return self.prewarmer
+
+    """ Starts watching the share and updating the tabs in place as tools are published/edited/removed """
+    def watchShare(self, debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL):
+        if self.watcher is None and self.scripts_uibuildinfo is not None:
+            self.watcher = ShareWatcher(self.scripts_uibuildinfo, debounce=debounce, poll_interval=poll_interval, parent=self)
+            self.watcher.catalogChanged.connect(self.applyCatalogChanges)
+            self.watcher.start()
+        return self.watcher
+
+    """ Updates just the tabs and type groups a live refresh touched """
+    def applyCatalogChanges(self, affected):
         """
-            Return: for funsies also simply returns the scripts list
+            affected - set of (project, type) groups whose icons changed in scripts_uibuildinfo
         """
-
-        # Get all of the script objects were adding
-        if os.path.isdir(self.scripts_path):
-            script_dirs = os.listdir(self.scripts_path)
-            scripts = list()
-            for dir in script_dirs:
-                final_script_path = os.path.join(self.scripts_path,dir)
-                if dir[:2] != '__' and os.path.isdir(final_script_path):
-                    info = ScriptInfo(json_path=final_script_path, program=self.program)                    
-                    script_command_info = {'command': info.command, 'icon':info.icon, 'tooltip':info.tooltip}
-                    if info.parent_projects != None:
-                        scripts.append(info)
-                        for project in info.parent_projects:
-                            tab_info = self.ui_build_info.get(project)
-
-                            if tab_info == None:
-                                types = dict()
-                                for type in info.parent_types: 
-                                    types[type] = [script_command_info]
-                                self.ui_build_info[project] = types
-                                '''
-                                print 'New Tab'
-                                print project
-                                print types
-                                print ''
-                                '''
-                            else:
-                                for type in info.parent_types:
-                                    type_info = tab_info.get(type)
-                                    if type_info:
-                                        '''
-                                        print 'existing group'
-                                        print type
-                                        print self.ui_build_info[project][type]
-                                        print ''
-                                        '''
-                                        self.ui_build_info[project][type].extend([script_command_info])
-                                        '''
-                                        print 'after extend'                                    
-                                        print self.ui_build_info[project][type]
-                                        print ''
-                                        '''
-                                    else:                                    
-                                        self.ui_build_info[project][type] = [script_command_info]
-                                        '''
-                                        print 'new group'
-                                        print type
-                                        print self.ui_build_info[project][type]
-                                        print ''
-                                        '''
-  
-
-            self.script_infos = scripts
+        catalog = self.scripts_uibuildinfo.catalog
+        for project in set(project for project, type in affected):
+            collapse_groups = catalog.collapse_groups(project)
+            index = self.tabs_wdgt.indexOfProject(project)
+            if index < 0:
+                if collapse_groups:
+                    self.addProjectTab(project, collapse_groups)
+            elif not collapse_groups:
+                self.tabs_wdgt.removeProjectTab(index)
+            else:
+                self.tabs_wdgt.updateTab(index, collapse_groups, [type for group_project, type in affected if group_project == project])
+        if self.search_results.isVisible():
+            self.searchChanged(self.search_edit.text())
+        self.broken_tools.refresh()
+
+    """ Shows the tools matching the search text - an empty search goes back to the tabs """
+    def searchChanged(self, text):
+        if text.strip() and self.scripts_uibuildinfo is not None:
+            results, matched = self.scripts_uibuildinfo.search_index.search_counted(text, limit=SEARCH_LIMIT)
+            self.search_results.setIcons(results)
+            if matched > len(results):
+                self.search_results.titleBubble.setText('Search results - %d more... keep typing to narrow it down' % (matched - len(results)))
+            else:
+                self.search_results.titleBubble.setText('Search results')
+            self.tabs_wdgt.hide()
+            self.search_results.show()
         else:
-            print 'Sorry ' + self.scripts_path + ' is not a valid directory.'
-        
-        
-        return self.script_infos
- 
-    
+            self.search_results.hide()
+            self.search_results.setIcons(list())
+            if self.tabs_wdgt.count():
+                self.tabs_wdgt.show()
+
+    def showEvent(self, event):
+        # Catch up on anything published while the window was closed
+        if self.watcher is not None:
+            self.watcher.scheduleRefresh()
+        super(MainScriptsShareWidget, self).showEvent(event)
+
+    """ Only the tab going out and the tab coming in change size policy - every other tab has kept Ignored since it was added """
+    def curTabChange(self, index):
+        self.tabs_wdgt.showTab(index)
+        incoming = self.tabs_wdgt.widget(index)
+        outgoing = self.shown_tab
+        if outgoing is not None and outgoing is not incoming and outgoing in self.tabs_wdgt.tabs: # a removed tab is already on its way out
+            outgoing.setSizePolicy(QtGui.QSizePolicy.Ignored, QtGui.QSizePolicy.Ignored)
+        if incoming is not None:
+            incoming.setSizePolicy(QtGui.QSizePolicy.Preferred, QtGui.QSizePolicy.Preferred)
+        self.shown_tab = incoming
+
 """ Connection point window creation for Maya """
-def create_window(controller, parent=None, scripts_share_path=None, program=None):
+def create_window(controller, parent=None, scripts_share_path=None, program=None, virtualized=False, watch=False):
     """
         controller - the parent controller object to connect to
         parent - the parent window to attach to
+        virtualized - show icons in IconGridViews rather than a widget per icon
+        watch - keep the toolbox up to date as tools are published to the share (see ShareWatcher)
         ui_build_info - dictionary of {tab_name: {collapsGroup1: {tooltip:'foo', icon:'c:\bluepath', command:'command string}, collapsGroup2: {...}}
                     NOTE: I chose to have a flat hierarchy and a `build info` -parent_projects/parent_types for tools that a user would like to share to multiple places for ease of end user discovery - IE they work in Animation so tend to stay on the animation tab but a tool made more with Environment in mind but is useful for animation can be posted to both sections if desired
     """
 
+    iconcache.forget_mtime() # icons edited since the last open get picked up
+
     # package up the information we want to build the ui with
     scripts_uibuildinfo =  WindowUIBuildInfo(full_path=scripts_share_path, program=program)
     
+    load_bundleImages(scripts_uibuildinfo)
+
     # sanity check
-    if scripts_uibuildinfo.ui_build_info:
+    if scripts_uibuildinfo.catalog.groups:
         window = ConverterWindow(parent)
         window.setWindowTitle('Scripts Share Toolbox')   
-        container = MainScriptsShareWidget(window, scripts_uibuildinfo)
+        container = MainScriptsShareWidget(window, scripts_uibuildinfo, virtualized=virtualized)
+        container.shelfRequested.connect(controller.shelfRequested)
+        connect_commandStatus(window, controller)
+        if watch:
+            container.watchShare()
         window.resize(400, 600)
         
         all_scripts = list()
@@ -599,6 +1204,288 @@ def create_window(controller, parent=None, scripts_share_path=None, program=None
     else:
         print 'Sorry, there is no build information for this ui.'
     
+""" Hands the icons published in the share's catalog bundle to their tools - those never touch the share or the thumbnail cache """
+def load_bundleImages(scripts_uibuildinfo):
+    bundle = scripts_uibuildinfo.bundle
+    if bundle is None:
+        return
+    for dir, info in scripts_uibuildinfo.catalog.items():
+        if info.image is None and info.icon:
+            icon = bundle.icon(dir, source_path=info.icon)
+            if icon is not None:
+                width, height, pixels = icon
+                info.image = iconcache.image_from_bytes(pixels, width, height)
+    scripts_uibuildinfo.release_bundle()
+
+""" Background worker for create_window_async - scans the share and decodes icons off the UI thread """
+class CatalogLoaderThread(QtCore.QThread):
+    tabReady = Signal(str, object) # project, {type: [ScriptInfo()]}
+    loadingFinished = Signal()
+
+    def __init__(self, scripts_share_path, program, parent=None):
+        super(CatalogLoaderThread, self).__init__(parent)
+        self.scripts_share_path = scripts_share_path
+        self.program = program
+        self.scripts_uibuildinfo = None
+        self.error = None # what stopped the load - loadingFinished goes out either way
+        self.cancelled = False
+
+    """ Asks the loader to stop - it gets to the end of the step it is on (the share scan can't be interrupted) and sends nothing more """
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            self._load()
+        except Exception as e: # share unreachable, no permission, broken index...
+            self.error = e
+            print 'Sorry, the toolbox could not load the tools from ' + unicode(self.scripts_share_path)
+            traceback.print_exc() # otherwise it is lost on the worker thread
+        finally:
+            if not self.cancelled:
+                self.loadingFinished.emit()
+
+    def _load(self):
+        scripts_uibuildinfo = WindowUIBuildInfo(full_path=self.scripts_share_path, program=self.program)
+        self.scripts_uibuildinfo = scripts_uibuildinfo
+        if self.cancelled:
+            return
+
+        # QImage is safe to decode on a worker thread - QPixmap isn't so the widgets convert on the UI thread
+        load_bundleImages(scripts_uibuildinfo)
+        thumbnails = iconcache.get_thumbnail_cache()
+        missing = missingpaths.get_missing_paths()
+        images = dict()
+        for project, collapse_groups in scripts_uibuildinfo.ui_build_info.items():
+            if self.cancelled:
+                return
+            for icons in collapse_groups.values():
+                for icon_info in icons:
+                    icon = icon_info.icon
+                    if icon and icon_info.image is None:
+                        if icon not in images:
+                            images[icon] = thumbnails.image(icon)
+                        icon_info.image = images[icon]
+                        if icon_info.image.isNull():
+                            missing.set_broken(icon_info.key, 'icon', icon, 'icon missing or unreadable')
+            # Each tab goes over as soon as it is ready so the first one is usable while the rest load
+            self.tabReady.emit(project, collapse_groups)
+
+        scripts_uibuildinfo.search_index # built here rather than on the UI thread at the first search
+
+
+_detached_threads = list() # cancelled loaders/rescans still finishing their scan - kept alive until they do
+
+""" Lets a cancelled loader finish the scan it is stuck in without holding up the UI thread or its old window """
+def detach_loader(loader):
+    detach_thread(loader, (loader.tabReady, loader.loadingFinished))
+
+
+""" Lets a cancelled thread finish on its own - its signals are cut off from the objects about to be deleted """
+def detach_thread(thread, signals):
+    """
+        thread - a loader/rescan thread that has been cancelled
+        signals - the thread's signals to disconnect - finished is always disconnected
+    """
+    thread.cancel()
+    for signal in tuple(signals) + (thread.finished,):
+        try:
+            signal.disconnect()
+        except (RuntimeError, TypeError):
+            pass # nothing connected
+    thread.setParent(None) # its parent is about to be deleted
+    _detached_threads.append(thread)
+    thread.finished.connect(thread.deleteLater)
+    thread.destroyed.connect(lambda *args: _detached_threads.remove(thread))
+    if thread.isFinished():
+        thread.deleteLater()
+
+
+""" Background rescan for ShareWatcher - only folders whose signature changed get re-read """
+class ShareScanThread(QtCore.QThread):
+    scanned = Signal(object, object) # {folder name: (signature, json information)}, [removed folder names]
+
+    def __init__(self, scripts_path, program, known, workers=catalogindex.DISCOVERY_WORKERS, parent=None):
+        """
+            known - {folder name: signature} of what the toolbox is currently showing
+        """
+        super(ShareScanThread, self).__init__(parent)
+        self.scripts_path = scripts_path
+        self.program = program
+        self.known = known
+        self.workers = workers
+        self.cancelled = False
+
+    """ Asks the rescan to stop - the folder scan it is in can't be interrupted, but nothing is sent after it """
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            folders = catalogindex.load_script_folders(self.scripts_path, self.program, self.known, self.workers)
+        except (IOError, OSError):
+            return # share unreachable - try again next time
+        if self.cancelled:
+            return
+
+        changed = dict()
+        seen = set()
+        for dir, signature, manifest in folders:
+            seen.add(dir)
+            if manifest is not None:
+                changed[dir] = (signature, manifest)
+        removed = [dir for dir in self.known if dir not in seen]
+        if changed or removed:
+            self.scanned.emit(changed, removed)
+
+
+""" Watches the scripts share and applies added/edited/removed tool folders to a WindowUIBuildInfo() """
+class ShareWatcher(QtCore.QObject):
+    """
+    QFileSystemWatcher watches the share, every tool folder and every manifest. Notifications are debounced
+    so a bulk publish only triggers one rescan. A polling timer covers network drives where notifications
+    don't arrive. Rescans run on a ShareScanThread and only re-read folders whose signature changed.
+    """
+    catalogChanged = Signal(object) # set of (project, type) groups whose icons changed
+
+    def __init__(self, scripts_uibuildinfo, debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL, parent=None):
+        super(ShareWatcher, self).__init__(parent)
+        self.scripts_uibuildinfo = scripts_uibuildinfo
+        self._scan = None
+        self._rescan = False
+
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self.scheduleRefresh)
+        self._watcher.fileChanged.connect(self.scheduleRefresh)
+
+        self._debounce = QtCore.QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce)
+        self._debounce.timeout.connect(self.refresh)
+
+        self._poll = QtCore.QTimer(self)
+        self._poll.setInterval(poll_interval)
+        self._poll.timeout.connect(self.poll)
+
+    def start(self):
+        self.watchPaths()
+        if self._poll.interval() > 0:
+            self._poll.start()
+
+    def stop(self, wait=WATCH_STOP_WAIT):
+        """
+            wait - ms to wait for a running rescan - one still going after that (ie a slow share) finishes on its own
+        """
+        self._poll.stop()
+        self._debounce.stop()
+        self._rescan = False
+        scan = self._scan
+        self._scan = None
+        if scan is not None and scan.isRunning():
+            scan.cancel()
+            if not scan.wait(wait):
+                detach_thread(scan, (scan.scanned,))
+        paths = self._watcher.directories() + self._watcher.files()
+        if paths:
+            self._watcher.removePaths(paths)
+
+    """ Watches the share, the tool folders and their manifests - new folders get picked up after each refresh """
+    def watchPaths(self):
+        scripts_path = self.scripts_uibuildinfo.scripts_path
+        manifest_name = catalogindex.manifest_name(self.scripts_uibuildinfo.program)
+        paths = [scripts_path]
+        for dir, signature in self.scripts_uibuildinfo.signatures.items():
+            paths.append(os.path.join(scripts_path, dir))
+            if signature and signature[1] is not None:
+                paths.append(os.path.join(scripts_path, dir, manifest_name))
+
+        watched = set(self._watcher.directories() + self._watcher.files())
+        new_paths = [path for path in paths if path not in watched]
+        if new_paths:
+            self._watcher.addPaths(new_paths)
+
+    """ Restarts the debounce timer - the refresh happens once the share has been quiet for a bit """
+    def scheduleRefresh(self, path=None):
+        self._debounce.start()
+
+    def poll(self):
+        parent = self.parent()
+        if parent is None or parent.isVisible(): # no point rescanning for a closed window - showEvent catches up
+            self.refresh()
+
+    """ Starts a background rescan of the share """
+    def refresh(self):
+        if self._scan is not None and self._scan.isRunning():
+            self._rescan = True
+            return
+        build_info = self.scripts_uibuildinfo
+        self._scan = ShareScanThread(build_info.scripts_path, build_info.program, dict(build_info.signatures), build_info.workers, parent=self)
+        scan = self._scan
+        scan.scanned.connect(self.applyScan)
+        scan.finished.connect(lambda: self.scanFinished(scan))
+        scan.start()
+
+    """ Applies a rescan to the build info on the UI thread """
+    def applyScan(self, changed, removed):
+        affected = set()
+        for dir in list(removed) + list(changed):
+            info = self.scripts_uibuildinfo.get_scriptInfo(dir)
+            if info is not None:
+                iconcache.forget_mtime(info.icon) # the folder changed - its icon might have too
+        for dir in removed:
+            affected.update(self.scripts_uibuildinfo.update_scriptFolder(dir))
+        for dir, (signature, scripts_info) in changed.items():
+            affected.update(self.scripts_uibuildinfo.update_scriptFolder(dir, scripts_info, signature))
+
+        self.watchPaths()
+        if affected:
+            self.catalogChanged.emit(affected)
+
+    def scanFinished(self, scan):
+        scan.deleteLater()
+        if scan is self._scan:
+            self._scan = None
+        if self._rescan:
+            self._rescan = False
+            self.refresh()
+
+
+""" Connection point window creation for Maya that doesn't block - the window opens straight away and tabs fill in as they load """
+def create_window_async(controller, parent=None, scripts_share_path=None, program=None, virtualized=False, watch=False):
+    """
+        controller - the parent controller object to connect to
+        parent - the parent window to attach to
+        scripts_share_path - full path to the directory where the script directories are
+        program - program to build the toolbox for
+        virtualized - show icons in IconGridViews rather than a widget per icon
+        watch - keep the toolbox up to date as tools are published to the share (see ShareWatcher)
+    """
+    window = ConverterWindow(parent)
+    window.setWindowTitle('Scripts Share Toolbox')
+    container = MainScriptsShareWidget(window, virtualized=virtualized)
+    container.shelfRequested.connect(controller.shelfRequested)
+    window.resize(400, 600)
+    window.setCentralWidget(container)
+    window.statusBar().showMessage('Loading tools...')
+    connect_commandStatus(window, controller)
+
+    def onfinished():
+        container.loadingFinished(loader.scripts_uibuildinfo, loader.error)
+        if loader.error is not None:
+            window.statusBar().showMessage('Sorry, loading the tools failed: %s' % loader.error)
+        else:
+            window.statusBar().clearMessage()
+        if watch:
+            container.watchShare()
+
+    iconcache.forget_mtime() # icons edited since the last open get picked up - the loader looks them up again off the UI thread
+    loader = CatalogLoaderThread(scripts_share_path, program, parent=window)
+    loader.tabReady.connect(container.addProjectTab)
+    loader.loadingFinished.connect(onfinished)
+    window.loader = loader # keep the thread alive with the window
+    loader.start()
+    return window
+
 ##################################
 # Test Calls to UI functionality #
 ##################################
@@ -0,0 +1,216 @@
+'''
+searchindex.py
+Inverted index over the toolbox's tools for the search field.
+
+Each tool is indexed once (however many projects/types it sits under) on the words in its tooltip,
+the module names its command imports, its projects and its types. camelCase and dotted names are
+split up so "flipObjectAlongXAxis" is found by "flip" or "axis".
+
+A query matches tools that have every query word - a word matches exactly, as the start of an
+indexed word, or (for words of FUZZY_MIN_LENGTH or more) with one typo. The typo lookup uses
+precomputed single-deletion variants of every indexed word so it is a couple of dictionary
+lookups rather than an edit distance against the whole vocabulary.
+'''
+
+import re
+import heapq
+import bisect
+
+FUZZY_MIN_LENGTH = 4
+WORD_CACHE_SIZE = 64 # query words whose matches are kept - typing a query asks for the same words again and again
+
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+FUZZY_SCORE = 1
+
+_WORD_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+_IMPORT_RE = re.compile(r'(?:^|[;\n])\s*(?:from\s+([\w\.]+)\s+import|import\s+([\w\., ]+?)(?:\s+as\s+\w+)?\s*(?=;|\n|$))')
+
+
+""" Splits text into lowercase search words - camelCase, dotted and underscored names are split up too """
+def tokenize(text):
+    if not text:
+        return list()
+    words = list()
+    for chunk in re.split(r'[^A-Za-z0-9]+', text):
+        if not chunk:
+            continue
+        lower_chunk = chunk.lower()
+        words.append(lower_chunk)
+        parts = [part.lower() for part in _WORD_RE.findall(chunk)]
+        if len(parts) > 1:
+            words.extend(parts)
+    return words
+
+
+""" Module names a python command imports """
+def get_commandModules(command):
+    modules = list()
+    for from_module, import_modules in _IMPORT_RE.findall(command or ''):
+        if from_module:
+            modules.append(from_module)
+        for module in (import_modules or '').split(','):
+            module = module.strip().split(' ')[0]
+            if module:
+                modules.append(module)
+    return modules
+
+
+""" Single character deletions of a word - two words one typo apart share one of these """
+def _deletions(word):
+    return set(word[:i] + word[i + 1:] for i in range(len(word)))
+
+
+""" The search index """
+class SearchIndex(object):
+    def __init__(self):
+        self.documents = dict() # key: icon_info
+        self.order = dict() # key: position tools were added in - ties keep the toolbox order
+        self.doc_tokens = dict() # key: set of words
+        self.postings = dict() # word: set of keys
+        self.vocabulary = list() # sorted words - prefix lookups bisect this
+        self.deletes = dict() # deletion variant: set of words
+        self._next_order = 0
+        self._word_matches = dict() # query word: match_word result - emptied whenever the index changes
+
+    """ Builds an index for everything in a WindowUIBuildInfo() """
+    @classmethod
+    def from_buildInfo(cls, scripts_uibuildinfo):
+        index = cls()
+        for dir, info in scripts_uibuildinfo.catalog.items():
+            index.add(dir, info, info)
+        return index
+
+    """ Indexes one tool """
+    def add(self, key, icon_info, info):
+        """
+            key - unique key for the tool (its script folder)
+            icon_info - what to hand back when the tool matches
+            info - the tool's ScriptInfo()
+        """
+        if key in self.documents:
+            self.remove(key)
+
+        text = [info.tooltip or ''] + get_commandModules(info.command) + list(info.parent_projects or []) + list(info.parent_types or [])
+        tokens = set()
+        for field in text:
+            tokens.update(tokenize(field))
+
+        self._word_matches.clear()
+        self.documents[key] = icon_info
+        self.order[key] = self._next_order
+        self._next_order += 1
+        self.doc_tokens[key] = tokens
+        for token in tokens:
+            keys = self.postings.get(token)
+            if keys is None:
+                keys = self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+                for deletion in _deletions(token) | set([token]):
+                    self.deletes.setdefault(deletion, set()).add(token)
+            keys.add(key)
+
+    """ Drops a tool from the index """
+    def remove(self, key):
+        if key not in self.documents:
+            return
+        self._word_matches.clear()
+        del self.documents[key]
+        del self.order[key]
+        for token in self.doc_tokens.pop(key):
+            keys = self.postings[token]
+            keys.discard(key)
+            if not keys:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+                for deletion in _deletions(token) | set([token]):
+                    words = self.deletes.get(deletion)
+                    if words is not None:
+                        words.discard(token)
+                        if not words:
+                            del self.deletes[deletion]
+
+    """ Scores every tool one query word matches """
+    def match_word(self, word):
+        """
+            Returns: {key: score} - shared with later calls for the same word so don't change it
+        """
+        scores = self._word_matches.get(word)
+        if scores is None:
+            scores = self._match_word(word)
+            if len(self._word_matches) >= WORD_CACHE_SIZE:
+                self._word_matches.clear()
+            self._word_matches[word] = scores
+        return scores
+
+    def _match_word(self, word):
+        # the keys are gathered a score at a time with set unions - a short word can hit most of the tools
+        fuzzy_keys = set()
+        if len(word) >= FUZZY_MIN_LENGTH:
+            candidates = set()
+            for deletion in _deletions(word) | set([word]):
+                candidates.update(self.deletes.get(deletion, ()))
+            for token in candidates:
+                fuzzy_keys.update(self.postings[token])
+
+        # exact and prefix - every word starting with it sits together in the sorted vocabulary
+        prefix_keys = set()
+        start = bisect.bisect_left(self.vocabulary, word)
+        end = bisect.bisect_left(self.vocabulary, word + '\x7f', start) # words are lowercase letters and digits - all sort before \x7f
+        for token in self.vocabulary[start:end]:
+            if token != word:
+                prefix_keys.update(self.postings[token])
+
+        scores = dict.fromkeys(fuzzy_keys, FUZZY_SCORE)
+        scores.update(dict.fromkeys(prefix_keys, PREFIX_SCORE))
+        scores.update(dict.fromkeys(self.postings.get(word, ()), EXACT_SCORE))
+        return scores
+
+    """ Finds the tools matching every word of a query - best matches first """
+    def search(self, query, limit=None):
+        """
+            query - text typed in the search field
+            limit - most results to return - None for all of them
+
+            Returns: list of icon_info
+        """
+        return self.search_counted(query, limit)[0]
+
+    """ search() that also says how many tools matched in all - ie for a "N more" note under a limited list """
+    def search_counted(self, query, limit=None):
+        """
+            Returns: (list of icon_info, number of tools matched)
+        """
+        words = list()
+        for word in tokenize(query):
+            if word not in words:
+                words.append(word)
+        if not words:
+            return list(), 0
+
+        totals = None
+        for word in sorted(words, key=len, reverse=True): # longest words narrow things down the most
+            scores = self.match_word(word)
+            if totals is None:
+                totals = scores
+            else:
+                totals = dict((key, total + scores[key]) for key, total in totals.items() if key in scores)
+            if not totals:
+                return list(), 0
+
+        if limit is not None and limit < len(totals):
+            # a short query matches most of the tools - only the ones shown get sorted, best score first
+            by_score = dict()
+            for key, total in totals.iteritems():
+                by_score.setdefault(total, list()).append(key)
+            keys = list()
+            for total in sorted(by_score, reverse=True):
+                keys.extend(heapq.nsmallest(limit - len(keys), by_score[total], key=self.order.get))
+                if len(keys) >= limit:
+                    break
+        else:
+            keys = sorted(totals, key=lambda key: (-totals[key], self.order[key]))
+        return [self.documents[key] for key in keys], len(totals)
+
+    def __len__(self):
+        return len(self.documents)
@@ -0,0 +1,180 @@
+'''
+tracing.py
+Opt-in timing spans for the toolbox - where the time goes while it opens and runs commands.
+
+Off by default, and a span is a single check when it is off. Turn it on with either -
+    the SCRIPTSSHARE_TRACE environment variable set to the trace file to write when Maya exits
+    tracing.enable('c:/temp/toolbox_trace.json') from the script editor (then reopen the toolbox)
+
+Spans nest - a span opened inside another shows up under it. The trace file is in Chrome's trace
+event format so it opens in chrome://tracing (or https://ui.perfetto.dev) as a timeline per thread.
+tracing.summary() (and the panel at the bottom of the toolbox while tracing is on) totals them by name.
+Only the last MAX_EVENTS spans are kept so a long Maya session with tracing left on doesn't keep growing.
+
+To Use:
+import tracing
+with tracing.span('my step', path=path):
+    do_the_step()
+'''
+
+import os
+import json
+import atexit
+import threading
+from collections import deque
+from timeit import default_timer # the high resolution clock on every platform
+
+TRACE_ENV = 'SCRIPTSSHARE_TRACE'
+MAX_EVENTS = 200000 # most recent spans kept - older ones drop off
+
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)
+_enabled = False
+_trace_path = None
+_epoch = default_timer()
+
+
+""" Stands in for a span while tracing is off """
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+""" Span arg as text - byte strings (ie paths) are decoded leniently so tracing never breaks the traced call """
+def _arg_text(value):
+    if isinstance(value, unicode):
+        return value
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    try:
+        return unicode(value)
+    except Exception:
+        return repr(value).decode('utf-8', 'replace')
+
+
+""" One timed span - recorded when it closes """
+class _Span(object):
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = default_timer()
+        event = {
+            'name': self.name,
+            'cat': self.category,
+            'ph': 'X',
+            'ts': (self.start - _epoch) * 1000000.0,
+            'dur': (end - self.start) * 1000000.0,
+            'pid': os.getpid(),
+            'tid': threading.current_thread().ident,
+        }
+        if self.args:
+            event['args'] = dict((key, _arg_text(value)) for key, value in self.args.items())
+        with _lock:
+            _events.append(event)
+        return False
+
+
+""" Times the code inside a with block """
+def span(name, category='toolbox', **args):
+    """
+        name - what the span is called in the trace and summary
+        category - groups spans in the trace viewer
+        args - extra details shown on the span in the trace viewer (ie the path being loaded)
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+""" Turns tracing on """
+def enable(trace_path=None):
+    """
+        trace_path - file the trace is written to when python exits - None to only save() it by hand
+    """
+    global _enabled, _trace_path
+    _enabled = True
+    if trace_path:
+        _trace_path = trace_path
+
+
+""" Turns tracing off - spans recorded so far are kept """
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+""" Forgets the recorded spans """
+def clear():
+    with _lock:
+        _events.clear()
+
+
+""" Copy of the recorded spans - Chrome trace events """
+def get_events():
+    with _lock:
+        return list(_events)
+
+
+""" Writes the recorded spans as a Chrome trace file """
+def save(trace_path=None):
+    """
+        trace_path - defaults to the path tracing was enabled with
+
+        Return: the path written - None if there was nowhere to write it
+    """
+    trace_path = trace_path or _trace_path
+    if not trace_path:
+        return None
+    content = {'traceEvents': get_events(), 'displayTimeUnit': 'ms'}
+    temp_path = '%s.%d.tmp' % (trace_path, os.getpid())
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(content, f)
+        if os.path.exists(trace_path):
+            os.remove(trace_path)
+        os.rename(temp_path, trace_path)
+    except (IOError, OSError) as e:
+        print 'Could not write the toolbox trace to %s: %s' % (trace_path, e)
+        return None
+    return trace_path
+
+
+""" Totals the recorded spans by name - most total time first """
+def summary():
+    """
+        Return: list of (name, count, total ms, max ms)
+    """
+    totals = dict()
+    for event in get_events():
+        count, total, longest = totals.get(event['name'], (0, 0.0, 0.0))
+        duration = event['dur'] / 1000.0
+        totals[event['name']] = (count + 1, total + duration, max(longest, duration))
+    rows = [(name, count, total, longest) for name, (count, total, longest) in totals.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def _save_at_exit():
+    if _enabled and _events:
+        save()
+
+atexit.register(_save_at_exit)
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV])
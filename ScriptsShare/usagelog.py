@@ -0,0 +1,183 @@
+'''
+usagelog.py
+Local log of which toolbox tools get run - feeds "most used first" ordering and the recent strips.
+
+Every click appends (tool, when, how long, did it work) to a SQLite database on the workstation's
+disk, in WAL mode so the toolbox can read usage while runs are being written. The click itself only
+drops the run on a queue - a background thread writes them out in batches, one transaction a batch.
+
+SCRIPTSSHARE_USAGE_DB overrides where the database lives.
+
+To Use:
+log = get_usage_log()
+log.record('flipObjectAlongXAxis', started, duration, success=True)
+log.counts() # {tool folder: runs}
+log.recent(8) # tool folders, most recently run first
+'''
+
+import os
+import time
+import atexit
+import sqlite3
+import threading
+import Queue
+
+FLUSH_INTERVAL = 2.0 # seconds the writer waits to gather a batch
+FLUSH_BATCH = 100 # most runs written in one transaction
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    tool TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_tool ON runs (tool);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+'''
+
+
+""" Default per user usage database - SCRIPTSSHARE_USAGE_DB overrides it """
+def default_usage_path():
+    usage_path = os.environ.get('SCRIPTSSHARE_USAGE_DB')
+    if usage_path:
+        return usage_path
+    root = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(root, 'ScriptsShare', 'usage.sqlite')
+
+
+""" Append only store of tool runs """
+class UsageLog(object):
+    def __init__(self, path=None, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH):
+        """
+            path - the SQLite database - defaults to a per user file
+            flush_interval - seconds the writer gathers runs for before writing them
+            flush_batch - most runs written per transaction
+        """
+        self.path = path or default_usage_path()
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._queue = Queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._local = threading.local() # sqlite connections can't cross threads
+
+    """ Connection for the calling thread - None if the database can't be opened """
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            try:
+                folder = os.path.dirname(self.path)
+                if folder and not os.path.isdir(folder):
+                    os.makedirs(folder)
+                connection = sqlite3.connect(self.path, timeout=5.0)
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+                connection.executescript(_SCHEMA)
+            except (sqlite3.Error, OSError) as e:
+                print 'Sorry, could not open the toolbox usage log %s: %s' % (self.path, e)
+                return None
+            self._local.connection = connection
+        return connection
+
+    """ Records one run - just queues it, the writer thread does the I/O """
+    def record(self, tool, started, duration, success=True):
+        """
+            tool - the tool's id (its script folder)
+            started - time.time() the run started
+            duration - seconds the run took
+            success - False if the command raised
+        """
+        if not tool:
+            return
+        self._queue.put((tool, started, duration, 1 if success else 0))
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='ScriptsShare usage log')
+                    self._writer.daemon = True
+                    self._writer.start()
+
+    def _write_loop(self):
+        closing = False
+        while not closing:
+            runs = [self._queue.get()] # sleeps until there is something to write
+            deadline = time.time() + self.flush_interval
+            while len(runs) < self.flush_batch:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    runs.append(self._queue.get(timeout=timeout))
+                except Queue.Empty:
+                    break
+            closing = None in runs # close() - write what there is and stop
+            self._write([run for run in runs if run is not None])
+
+    def _write(self, runs):
+        if not runs:
+            return
+        connection = self.connection()
+        if connection is None:
+            return
+        try:
+            with connection: # one transaction per batch
+                connection.executemany('INSERT INTO runs (tool, started, duration, success) VALUES (?, ?, ?, ?)', runs)
+        except sqlite3.Error as e:
+            print 'Sorry, could not write to the toolbox usage log: %s' % e
+
+    """ Writes anything still queued and stops the writer thread - recording again starts a new one """
+    def close(self, timeout=5.0):
+        with self._writer_lock:
+            writer = self._writer
+            self._writer = None
+        if writer is not None and writer.is_alive():
+            self._queue.put(None)
+            writer.join(timeout)
+
+    """ How many times each tool has been run """
+    def counts(self, since=None):
+        """
+            since - only count runs after this time.time() - None for all of them
+
+            Return: {tool: runs}
+        """
+        connection = self.connection()
+        if connection is None:
+            return dict()
+        try:
+            rows = connection.execute('SELECT tool, COUNT(*) FROM runs WHERE started >= ? GROUP BY tool', (since or 0,)).fetchall()
+        except sqlite3.Error:
+            return dict()
+        return dict(rows)
+
+    """ The most recently run tools """
+    def recent(self, limit=None):
+        """
+            Return: list of tools - most recently run first
+        """
+        connection = self.connection()
+        if connection is None:
+            return list()
+        try:
+            rows = connection.execute('SELECT tool, MAX(started) AS last FROM runs GROUP BY tool ORDER BY last DESC LIMIT ?', (limit or -1,)).fetchall()
+        except sqlite3.Error:
+            return list()
+        return [tool for tool, last in rows]
+
+
+_usage_log = None
+
+""" The shared usage log """
+def get_usage_log():
+    global _usage_log
+    if _usage_log is None:
+        _usage_log = UsageLog()
+    return _usage_log
+
+
+def _close_at_exit():
+    if _usage_log is not None:
+        _usage_log.close()
+
+atexit.register(_close_at_exit)
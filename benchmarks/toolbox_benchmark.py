@@ -0,0 +1,248 @@
+'''
+toolbox_benchmark.py
+Benchmarks for the Scripts Share Toolbox - runs under plain python, no Maya needed.
+
+Generates synthetic scripts shares (a tool folder per tool with a manifest and an icon) and measures
+    scan - WindowUIBuildInfo over the share (straight folder scan, cold catalog index, warm catalog index, published bundle)
+    build - create_window with every project tab built (tabs are otherwise only built when shown), then switching through them
+    insert - filling a ScrollingFlowWidget one widget at a time and as one addWidgets batch
+    layout - FlowLayout heightForWidth/setGeometry passes while "dragging" the window edge
+    memory - peak resident memory of the run
+Each share size runs in its own python process so the peak memory numbers don't bleed into each other.
+
+maya/pymel get stubbed out if they aren't importable. Qt 4 (PySide/PyQt4) still needs a display - on a
+machine without one run it under xvfb.
+
+To Use:
+python benchmarks/toolbox_benchmark.py --sizes 100 1000 10000 --output bench_results.json
+xvfb-run python benchmarks/toolbox_benchmark.py ... (no display)
+
+Results are written as json so runs can be compared for regressions -
+{
+    "python": "2.7.18", "qt": "4.8.7", "created": "2020-01-01 12:00:00",
+    "results": [{"tools": 100, "scan_seconds": ..., "build_seconds": ..., ...}, ...]
+}
+'''
+
+import os
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import tempfile
+import argparse
+import subprocess
+
+SCRIPTS_SHARE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ScriptsShare')
+
+PROJECTS = ['General', 'Evil Genius', 'ZA4', 'Misc', 'Strange Brigade']
+TYPES = ['Animation', 'Modeling', 'Rigging', 'Export', 'Import', 'Environment', 'Lighting', 'FX']
+LAYOUT_WIDTHS = range(200, 1200, 25) # window edge drag
+
+
+""" Stands in for maya/pymel so the toolbox modules import outside of Maya """
+def stub_maya():
+    for name in ['maya', 'maya.OpenMaya', 'maya.OpenMayaUI', 'maya.cmds', 'maya.mel', 'maya.utils', 'pymel', 'pymel.core']:
+        try:
+            __import__(name)
+        except ImportError:
+            module = types.ModuleType(name)
+            sys.modules[name] = module
+            if '.' in name:
+                parent_name, child_name = name.rsplit('.', 1)
+                setattr(sys.modules[parent_name], child_name, module)
+
+
+""" Peak resident memory of this process in bytes - None where the resource module doesn't exist (windows) """
+def get_peak_memory():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak # bytes on mac
+    return peak * 1024 # kilobytes everywhere else
+
+
+""" Writes a synthetic share of tool_count tool folders """
+def generate_share(share_path, tool_count, QtGui, seed=0):
+    rnd = random.Random(seed)
+    for i in range(tool_count):
+        name = 'benchmarkTool%05d' % i
+        folder = os.path.join(share_path, name)
+        os.makedirs(folder)
+
+        icon_path = os.path.join(folder, name + '.png').replace('\\', '/')
+        image = QtGui.QImage(64, 64, QtGui.QImage.Format_ARGB32)
+        image.fill(rnd.randint(0, 0xffffff) | 0xff000000)
+        image.save(icon_path)
+
+        manifest = {
+            'command': 'import benchmarkTools.%s as tool; reload(tool); tool.run()' % name,
+            'icon': icon_path,
+            'tooltip': 'Benchmark tool %d for %s' % (i, rnd.choice(TYPES)),
+            'parent_projects': rnd.sample(PROJECTS, rnd.randint(1, 2)),
+            'parent_types': rnd.sample(TYPES, rnd.randint(1, 3)),
+        }
+        with open(os.path.join(folder, 'scriptInformation_maya.json'), 'w') as f:
+            json.dump(manifest, f, indent=4, sort_keys=True)
+
+
+""" Seconds a call takes """
+def timed(call):
+    start = time.time()
+    result = call()
+    return time.time() - start, result
+
+
+""" Benchmarks one share size - runs in its own process """
+def run_one(tool_count, keep_share=False):
+    stub_maya()
+    sys.path.insert(0, SCRIPTS_SHARE_DIR)
+
+    from qtshim import QtGui, QtCore
+    app = QtGui.QApplication.instance() or QtGui.QApplication(['toolbox_benchmark'])
+
+    temp_root = tempfile.mkdtemp(prefix='scriptsshare_benchmark_')
+    share_path = os.path.join(temp_root, 'ScriptsShare')
+    os.makedirs(share_path)
+    # start every run cold - and keep the user's own caches out of it
+    os.environ['SCRIPTSSHARE_THUMBNAIL_DIR'] = os.path.join(temp_root, 'thumbnails')
+    os.environ['SCRIPTSSHARE_MISSING_PATHS'] = os.path.join(temp_root, 'missing_paths.json')
+    os.environ['SCRIPTSSHARE_USAGE_DB'] = os.path.join(temp_root, 'usage.db')
+
+    import commandcache
+    import scriptssharecore
+    import scriptssharetoolbox_ui as scriptssharegui
+
+    # every scan precompiles the tools' commands into the module level cache - later scans would find them there
+    def scan(**kwargs):
+        commandcache.clear()
+        return scriptssharecore.WindowUIBuildInfo(full_path=share_path, program='maya', **kwargs)
+
+    result = {'tools': tool_count}
+    try:
+        result['generate_seconds'], _ = timed(lambda: generate_share(share_path, tool_count, QtGui))
+
+        # Catalog scan - the Qt free core
+        result['scan_seconds'], build_info = timed(lambda: scan(use_index=False))
+        result['scan_serial_seconds'], _ = timed(lambda: scan(use_index=False, workers=1))
+        result['scan_index_cold_seconds'], _ = timed(lambda: scan())
+        result['scan_index_warm_seconds'], _ = timed(lambda: scan())
+        result['search_index_seconds'], _ = timed(lambda: build_info.search_index)
+        import catalogbundle
+        result['publish_bundle_seconds'], _ = timed(lambda: catalogbundle.publish(share_path, 'maya'))
+        result['scan_bundle_seconds'], _ = timed(lambda: scan())
+        result['scan_bundle_mmap_seconds'], _ = timed(lambda: scan(use_mmap=True))
+        os.remove(catalogbundle.default_bundle_path(share_path, 'maya')) # the window builds below time the folder scan path
+        result['projects'] = len(build_info.catalog.groups)
+        result['icons'] = sum(len(positions) for types in build_info.catalog.groups.values() for positions in types.values())
+
+        # Whole window
+        controller = scriptssharegui.ScriptsShareController()
+        def build_all_tabs(virtualized):
+            commandcache.clear()
+            window = scriptssharegui.create_window(controller, scripts_share_path=share_path, program='maya', virtualized=virtualized)
+            tabs = window.centralWidget().tabs_wdgt
+            for index in range(tabs.count()):
+                tabs.buildTab(index)
+            return window
+        result['build_seconds'], window = timed(lambda: build_all_tabs(False))
+        result['build_virtualized_seconds'], window_virtualized = timed(lambda: build_all_tabs(True))
+        app.processEvents()
+
+        # FlowLayout - every tool in one flow, added one at a time and then as a batch
+        def add_one_at_a_time():
+            flow_widget = scriptssharegui.ScrollingFlowWidget()
+            for icon_info in build_info.script_infos:
+                flow_widget.addWidget(scriptssharegui.IconLabelWidget(icon_info=icon_info))
+            flow_widget.show()
+            app.processEvents()
+            return flow_widget
+        def add_batch():
+            flow_widget = scriptssharegui.ScrollingFlowWidget()
+            flow_widget.addWidgets([scriptssharegui.IconLabelWidget(icon_info=icon_info) for icon_info in build_info.script_infos])
+            flow_widget.show()
+            app.processEvents()
+            return flow_widget
+        result['flow_insert_seconds'], flow_widget = timed(add_one_at_a_time)
+        flow_widget.close()
+        result['flow_insert_batch_seconds'], flow_widget = timed(add_batch)
+        flow_widget.close()
+        flow = flow_widget.flowLayout
+
+        # Switching between every project tab - build_all_tabs already built them
+        tabs = window.centralWidget().tabs_wdgt
+        window.show()
+        def switch_tabs():
+            for index in range(tabs.count()):
+                tabs.setCurrentIndex(index)
+                app.processEvents()
+        result['tab_switch_seconds'], _ = timed(switch_tabs)
+
+        def drag_edge():
+            for width in LAYOUT_WIDTHS:
+                height = flow.heightForWidth(width)
+                flow.setGeometry(QtCore.QRect(0, 0, width, height))
+        result['layout_resize_seconds'], _ = timed(drag_edge)
+        result['layout_resize_repeat_seconds'], _ = timed(drag_edge) # widths seen before
+        result['layout_passes'] = len(LAYOUT_WIDTHS)
+
+        window.close()
+        window_virtualized.close()
+        app.processEvents()
+    finally:
+        if keep_share:
+            result['share_path'] = share_path
+        else:
+            shutil.rmtree(temp_root, ignore_errors=True)
+
+    result['peak_memory_bytes'] = get_peak_memory()
+    return result
+
+
+""" Runs every size in a fresh process and writes the results """
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless Scripts Share Toolbox benchmarks.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='tool folder counts to benchmark')
+    parser.add_argument('--output', default='bench_results.json', help='json file to write the results to')
+    parser.add_argument('--keep-share', action='store_true', help="don't delete the generated shares")
+    parser.add_argument('--run-one', type=int, default=None, help=argparse.SUPPRESS) # used for the per size processes
+    args = parser.parse_args(argv)
+
+    if args.run_one is not None:
+        sys.stdout.write(json.dumps(run_one(args.run_one, keep_share=args.keep_share)))
+        return 0
+
+    results = list()
+    for tool_count in args.sizes:
+        print 'Benchmarking %d tools...' % tool_count
+        command = [sys.executable, os.path.abspath(__file__), '--run-one', str(tool_count)]
+        if args.keep_share:
+            command.append('--keep-share')
+        output = subprocess.check_output(command)
+        result = json.loads(output.strip().splitlines()[-1])
+        for key in sorted(result):
+            print '    %s: %s' % (key, result[key])
+        results.append(result)
+
+    stub_maya()
+    sys.path.insert(0, SCRIPTS_SHARE_DIR)
+    from qtshim import QtCore
+    content = {
+        'python': '.'.join(str(part) for part in sys.version_info[:3]),
+        'qt': QtCore.qVersion(),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(content, f, indent=4, sort_keys=True)
+    print 'Results written to ' + args.output
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
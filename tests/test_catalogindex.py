@@ -0,0 +1,62 @@
+'''
+test_catalogindex.py
+Checks the catalog index against a throwaway share - needs no Maya or Qt.
+
+To Run:
+python -m unittest discover tests
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ScriptsShare'))
+
+import catalogindex
+import missingpaths
+
+
+""" A broken manifest stays in the broken tools report on every open, not just the one that read it """
+class BrokenManifestReportTest(unittest.TestCase):
+    def setUp(self):
+        self.share = tempfile.mkdtemp()
+        for dir, content in (('goodTool', json.dumps({'parent_projects': ['p'], 'type': 't'})), ('brokenTool', '{"parent_projects": [')):
+            os.mkdir(os.path.join(self.share, dir))
+            with open(os.path.join(self.share, dir, catalogindex.manifest_name('maya')), 'w') as f:
+                f.write(content)
+        self._missing_paths = missingpaths._missing_paths
+
+    def tearDown(self):
+        missingpaths._missing_paths = self._missing_paths
+        shutil.rmtree(self.share)
+
+    """ One toolbox open - a new session's missing paths, the index read from and saved to the share """
+    def open_toolbox(self):
+        missingpaths._missing_paths = missingpaths.MissingPaths()
+        index = catalogindex.CatalogIndex(self.share, 'maya')
+        index.load()
+        index.refresh(workers=1)
+        if index.changed:
+            index.save()
+        return missingpaths.get_missing_paths().report()
+
+    def test_report_survives_reopening(self):
+        first = self.open_toolbox()
+        second = self.open_toolbox() # brokenTool is unchanged, so this open takes it from the index
+        self.assertEqual([tool for tool, problem, path in first], ['brokenTool'])
+        self.assertEqual(second, first)
+
+    def test_fixed_manifest_clears_report(self):
+        self.open_toolbox()
+        manifest_path = os.path.join(self.share, 'brokenTool', catalogindex.manifest_name('maya'))
+        with open(manifest_path, 'w') as f:
+            f.write(json.dumps({'parent_projects': ['p'], 'type': 't', 'tooltip': 'fixed now'}))
+        os.utime(manifest_path, (1, 1)) # a different signature even within the filesystem's mtime resolution
+        self.assertEqual(self.open_toolbox(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()